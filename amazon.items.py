@@ -1,88 +1,66 @@
+import os
+import csv
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-from bs4 import BeautifulSoup
 
-# Function to scrape Amazon search results
-def scrape_amazon_search_results(url):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-    }
-    response = requests.get(url, headers=headers)
-    
-    # Check if the request was successful
-    if response.status_code != 200:
-        print(f"Failed to retrieve the webpage. Status code: {response.status_code}")
-        return []
-    
-    soup = BeautifulSoup(response.content, 'html.parser')
-    
-    products = soup.find_all('div', {'data-asin': True, 'data-component-type': 's-search-result'})
+import http_session
+import response_cache
+from parsing import id_strainer, parse_html
+from price_history import PriceHistory
+from prices import normalize_rows
+from rate_limit import TokenBucket
+from sites import get_adapter
+
+SEARCH_URL = "https://www.amazon.nl/s?k=pc&__mk_nl_NL=%C3%85M%C3%85%C5%BD%C3%95%C3%91"
+PRODUCT_URL = "https://www.amazon.nl/dp/{asin}"
+
+# Columns added by the price normalization, named like the other Amazon columns
+AMAZON_PRICE_FIELDS = ('Amount', 'Currency', 'Price Type')
+
+# Title, price and rating live in the ppd block; the specification tables sit below it
+PRODUCT_STRAINER = id_strainer('ppd', 'productTitle', 'acrCustomerReviewText', 'poExpander', 'productDetails_techSpec_section_1')
+
+# The search results are read by the amazon.nl site adapter, like in engine.py, under this
+# script's column names. The Amazon-only columns are filled in from the product pages.
+AMAZON = get_adapter('amazon.nl')
+SEARCH_COLUMNS = [('asin', 'ASIN'), ('title', 'Title'), ('rating', 'Rating'), ('reviews', 'Number of Reviews'),
+                  ('price', 'Price'), ('shipping', 'Shipping Info'), ('url', 'URL')]
+
+# Function to parse the products on an Amazon search results page
+def parse_amazon_search_results(html):
+    listings = AMAZON.parse_page(html)[0]
     
     # Check if any products were found
-    if not products:
+    if not listings:
         print("No products found on the page.")
-        return []
-    
-    all_products = []
+        return
     
-    for index, product in enumerate(products):
-        product_details = {}
-        
-        # Extract product title
-        title_section = product.find('h2', class_='a-size-mini a-spacing-none a-color-base s-line-clamp-4')
-        if title_section:
-            product_details['Title'] = title_section.get_text(strip=True)
-        
-        # Extract product rating
-        rating_section = product.find('span', class_='a-icon-alt')
-        if rating_section:
-            product_details['Rating'] = rating_section.get_text(strip=True)
-        
-        # Extract number of reviews
-        reviews_section = product.find('span', class_='a-size-base s-underline-text')
-        if reviews_section:
-            product_details['Number of Reviews'] = reviews_section.get_text(strip=True)
-        
-        # Extract product price
-        price_whole_section = product.find('span', class_='a-price-whole')
-        price_fraction_section = product.find('span', class_='a-price-fraction')
-        price_symbol_section = product.find('span', class_='a-price-symbol')
-        if price_whole_section and price_fraction_section and price_symbol_section:
-            product_details['Price'] = price_symbol_section.get_text(strip=True) + price_whole_section.get_text(strip=True)  + price_fraction_section.get_text(strip=True)
-        
-        # Extract delivery date
-        delivery_section = product.find('span', {'aria-label': True})
-        if delivery_section:
-            product_details['Delivery Date'] = delivery_section.get_text(strip=True)
-        
-        # Extract shipping information
-        shipping_section = product.find('div', class_='a-row a-size-base a-color-secondary s-align-children-center')
-        if shipping_section:
-            shipping_info = shipping_section.find_all('span')
-            product_details['Shipping Info'] = ' '.join([info.get_text(strip=True) for info in shipping_info])
-        
-        # Extract product URL
-        product_link = product.find('a', class_='a-link-normal s-no-outline')
-        if product_link:
-            product_details['URL'] = 'https://www.amazon.nl' + product_link['href']
-        
-        # Add to the list of all products if at least one detail is found
-        if product_details:
-            all_products.append(product_details)
-    
-    return all_products
+    for listing in listings:
+        # Fields missing from the result card are left out, the CSV fills them in with N/A
+        yield {column: listing[field] for field, column in SEARCH_COLUMNS if listing.get(field, 'N/A') != 'N/A'}
 
-# Function to extract detailed product information from a product page
-def get_amazon_product_details(url):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"}
-    
-    response = requests.get(url, headers=headers)
+# Function to scrape Amazon search results, yielding each product as soon as it is parsed
+def iter_amazon_search_results(url):
+    response = http_session.get(url)
     
+    # Check if the request was successful
     if response.status_code != 200:
-        print(f"Failed to retrieve the web page. Status code: {response.status_code}")
-        return None
+        print(f"Failed to retrieve the webpage. Status code: {response.status_code}")
+        return
     
-    soup = BeautifulSoup(response.content, 'html.parser')
+    yield from parse_amazon_search_results(response.content)
+
+# Function to collect all Amazon search results into a list
+def scrape_amazon_search_results(url):
+    return list(iter_amazon_search_results(url))
+
+# Function to extract detailed product information from a product page
+def parse_amazon_product_details(html):
+    soup = parse_html(html, PRODUCT_STRAINER)
     
     # Initialize a dictionary to store product details
     product_details = {}
@@ -133,33 +111,140 @@ def get_amazon_product_details(url):
     
     return product_details
 
-if __name__ == "__main__":
-    # Example usage
-    url = "https://www.amazon.nl/s?k=pc&__mk_nl_NL=%C3%85M%C3%85%C5%BD%C3%95%C3%91"
-    search_results = scrape_amazon_search_results(url)
-    
-    for index, product in enumerate(search_results):
-        print(f"Product {index+1}: {product}")
+# Function to fetch a product page and extract its details
+def get_amazon_product_details(url):
+    response = http_session.get(url)
     
-    # Prompt user for the product number
-    product_number = input("Please enter the product number you are interested in: ")
+    if response.status_code != 200:
+        print(f"Failed to retrieve the web page. Status code: {response.status_code}")
+        return None
     
-    # Extract the number from the input
-    try:
-        product_index = int(product_number.strip()) - 1
-        if 0 <= product_index < len(search_results):
-            product_url = search_results[product_index]['URL']
-            
-            # Get product details
-            details = get_amazon_product_details(product_url)
-            
-            # Print product details
+    return parse_amazon_product_details(response.content)
+
+# Function to build the URL of a later search results page
+def search_page_url(url, page):
+    return url if page == 1 else f"{url}&page={page}"
+
+# Function to fetch every product's detail page and merge it into its search result row,
+# yields (row, whether the detail page could be read)
+def enrich_products(rows, workers=4, rate=1.0):
+    limiter = TokenBucket(rate, burst=workers)
+    
+    def fetch(row):
+        limiter.acquire()
+        url = row.get('URL') or PRODUCT_URL.format(asin=row['ASIN'])
+        # A page that still fails after the retries counts as failed instead of ending the batch
+        try:
+            return get_amazon_product_details(url)
+        except requests.RequestException as e:
+            print(f"Failed to retrieve {url}: {e}")
+            return None
+    
+    # Detail pages are fetched concurrently, results come back in the order of the rows
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for row, details in zip(rows, pool.map(fetch, rows)):
             if details:
-                print(details)
+                # Keep the search result values and add the specification tables from the detail page
+                for key, value in details.items():
+                    row.setdefault(key, value)
+            yield row, details is not None
+
+# Function to save rows with varying specification columns to a CSV file
+def save_rows_csv(rows, file_path):
+    fieldnames = []
+    for row in rows:
+        for key in row:
+            if key not in fieldnames:
+                fieldnames.append(key)
+    
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, restval='N/A')
+        writer.writeheader()
+        writer.writerows(rows)
+
+# Function to run the non-interactive batch mode
+def run_batch(args):
+    if args.asins:
+        rows = [{'ASIN': asin.strip()} for asin in args.asins if asin.strip()]
+    else:
+        rows = []
+        for page in range(1, args.pages + 1):
+            rows.extend(iter_amazon_search_results(search_page_url(args.search, page)))
+    
+    if not rows:
+        print("No products to enrich.")
+        return
+    
+    start = time.perf_counter()
+    failed = 0
+    for row, enriched in enrich_products(rows, workers=args.workers, rate=args.rate):
+        failed += not enriched
+    elapsed = time.perf_counter() - start
+    print(f"Fetched {len(rows)} product pages in {elapsed:.1f}s ({len(rows) / elapsed:.2f} pages/s), {failed} failed.")
+    
+    # Numeric price columns next to the price text
+    rows = normalize_rows(rows, column='Price', default_currency='EUR', fields=AMAZON_PRICE_FIELDS)
+    
+    # Create the directory if it doesn't exist
+    directory = "Amazon_Data"
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    file_path = args.output or os.path.join(directory, f'amazon_products_{timestamp}.csv')
+    save_rows_csv(rows, file_path)
+    print(f"Saved {len(rows)} products to {file_path}")
+    
+    if not args.no_history:
+        history = PriceHistory()
+        try:
+            history.record('amazon', rows, 'ASIN', price_field='Price', title_field='Title', fields=AMAZON_PRICE_FIELDS)
+        finally:
+            history.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Scrape Amazon.nl search results, optionally with the details of every product.')
+    parser.add_argument('--search', nargs='?', const=SEARCH_URL, help='Batch mode: enrich every result of this search URL')
+    parser.add_argument('--asins', nargs='+', help='Batch mode: enrich these ASINs instead of a search')
+    parser.add_argument('--pages', type=int, default=1, help='Number of search result pages to include')
+    parser.add_argument('--workers', type=int, default=4, help='Number of detail pages fetched in parallel')
+    parser.add_argument('--rate', type=float, default=1.0, help='Maximum detail page requests per second')
+    parser.add_argument('--output', help='CSV file to write (defaults to Amazon_Data/amazon_products_<timestamp>.csv)')
+    parser.add_argument('--no-history', action='store_true', help='Do not add the prices to the price history')
+    parser.add_argument('--cache', choices=response_cache.CACHE_MODES, help=response_cache.CACHE_HELP)
+    args = parser.parse_args()
+    response_cache.configure(mode=args.cache)
+    
+    if args.search or args.asins:
+        run_batch(args)
+    else:
+        # Interactive mode: list one search page and show the details of a single product
+        url = SEARCH_URL
+        search_results = []
+        
+        for index, product in enumerate(iter_amazon_search_results(url)):
+            print(f"Product {index+1}: {product}")
+            search_results.append(product)
+        
+        # Prompt user for the product number
+        product_number = input("Please enter the product number you are interested in: ")
+        
+        # Extract the number from the input
+        try:
+            product_index = int(product_number.strip()) - 1
+            if 0 <= product_index < len(search_results):
+                product_url = search_results[product_index]['URL']
+                
+                # Get product details
+                details = get_amazon_product_details(product_url)
+                
+                # Print product details
+                if details:
+                    print(details)
+                else:
+                    print("Failed to retrieve product details.")
             else:
-                print("Failed to retrieve product details.")
-        else:
+                print("Invalid product number.")
+        
+        except (IndexError, ValueError):
             print("Invalid product number.")
-    
-    except (IndexError, ValueError):
-        print("Invalid product number.")
@@ -1,18 +1,12 @@
-import requests
-from bs4 import BeautifulSoup
+import http_session
+from parsing import id_strainer, parse_html
 
-# Function to extract product details
-def get_amazon_product_details(url):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"}
-    
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code != 200:
-        print(f"Failed to retrieve the web page. Status code: {response.status_code}")
-        return None
-    
-    soup = BeautifulSoup(response.content, 'html.parser')
+# Title, price and rating all live in the ppd block of the product page
+PRODUCT_STRAINER = id_strainer('ppd', 'productTitle', 'acrCustomerReviewText')
+
+# Function to extract product details from a product page
+def parse_amazon_product_details(html):
+    soup = parse_html(html, PRODUCT_STRAINER)
     
     # Initialize a dictionary to store product details
     product_details = {}
@@ -44,6 +38,16 @@ def get_amazon_product_details(url):
     
     return product_details
 
+# Function to fetch a product page and extract its details
+def get_amazon_product_details(url):
+    response = http_session.get(url)
+    
+    if response.status_code != 200:
+        print(f"Failed to retrieve the web page. Status code: {response.status_code}")
+        return None
+    
+    return parse_amazon_product_details(response.content)
+
 if __name__ == "__main__":
     # Prompt user for the Amazon product URL
     product_url = input("Please enter the Amazon product URL: ")
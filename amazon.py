@@ -1,18 +1,12 @@
-import requests
-from bs4 import BeautifulSoup
+import http_session
+from parsing import id_strainer, parse_html
 
-# Function to extract product details
-def get_amazon_product_details(url):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"}
-    
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code != 200:
-        print(f"Failed to retrieve the web page. Status code: {response.status_code}")
-        return None
-    
-    soup = BeautifulSoup(response.content, 'html.parser')
+# Title, price and rating all live in the ppd block of the product page
+PRODUCT_STRAINER = id_strainer('ppd', 'productTitle', 'acrCustomerReviewText')
+
+# Function to extract product details from a product page
+def parse_amazon_product_details(html):
+    soup = parse_html(html, PRODUCT_STRAINER)
     
     # Initialize a dictionary to store product details
     product_details = {}
@@ -44,14 +38,25 @@ def get_amazon_product_details(url):
     
     return product_details
 
-# URL of the Amazon product page
-product_url = 'https://www.amazon.com/HP-Students-Business-Quad-Core-Storage/dp/B0B2D77YB8/ref=sr_1_3?sr=8-3'
+# Function to fetch a product page and extract its details
+def get_amazon_product_details(url):
+    response = http_session.get(url)
+    
+    if response.status_code != 200:
+        print(f"Failed to retrieve the web page. Status code: {response.status_code}")
+        return None
+    
+    return parse_amazon_product_details(response.content)
+
+if __name__ == "__main__":
+    # URL of the Amazon product page
+    product_url = 'https://www.amazon.com/HP-Students-Business-Quad-Core-Storage/dp/B0B2D77YB8/ref=sr_1_3?sr=8-3'
 
-# Get product details
-details = get_amazon_product_details(product_url)
+    # Get product details
+    details = get_amazon_product_details(product_url)
 
-# Print product details
-if details:
-    print(details)
-else:
-    print("Failed to retrieve product details.")
+    # Print product details
+    if details:
+        print(details)
+    else:
+        print("Failed to retrieve product details.")
@@ -1,300 +1,210 @@
-from flask import Flask, render_template_string, send_file, request
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
+from flask import Flask, Response, render_template_string, send_file, request, jsonify, url_for
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import pandas as pd
+import os
 import time
-from io import BytesIO
-from docx import Document
-from docx.shared import Inches
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
+import atexit
+import tempfile
+from functools import partial
+
+from driver_pool import DriverPool, make_chrome_driver
+from jobs import JobQueue
+from result_cache import ResultCache, steam_key
+from snapshot import SnapshotStore, SnapshotRefresher
+import steam_market
+import http_session
+from exporters import ExcelStreamWriter, ParquetStreamWriter, WordStreamWriter, iter_csv, iter_ndjson
+import response_cache
 
 app = Flask(__name__)
 
-def scrape_steam_market(page):
-    options = Options()
-    options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
+DRIVER_POOL_SIZE = 2  # Maximum number of Chrome instances kept alive at once
+DRIVER_MAX_PAGES = 50  # Restart a browser after this many page loads
+DRIVER_LEAN = True  # Skip images, stylesheets, fonts and third-party hosts in the browser
+# Hosts the lean browser may reach: the market itself and the CDN with its scripts, which
+# render the #pN result pages
+DRIVER_ALLOWED_HOSTS = ('steamcommunity.com', 'community.cloudflare.steamstatic.com', 'community.akamai.steamstatic.com')
 
-    service = Service('./chromedriver/chromedriver.exe')  # Update this with the actual path to your ChromeDriver
-    driver = webdriver.Chrome(service=service, options=options)
-    
-    if page == 1:
-        url = 'https://steamcommunity.com/market/search?appid=730'
-    else:
-        url = f'https://steamcommunity.com/market/search?appid=730#p{page}_popular_desc'
-    
-    driver.get(url)
+driver_pool = DriverPool(factory=partial(make_chrome_driver, lean=DRIVER_LEAN, allowed_hosts=DRIVER_ALLOWED_HOSTS),
+                         size=DRIVER_POOL_SIZE, max_pages=DRIVER_MAX_PAGES)
+atexit.register(driver_pool.close)
 
-    try:
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, 'searchResultsRows'))
-        )
-    except Exception as e:
-        driver.quit()
-        return []
-
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
-    driver.quit()
-
-    results = soup.find('div', id='searchResultsRows')
-    top_items = []
-    for item in results.find_all('a', class_='market_listing_row_link'):
-        name = item.find('span', class_='market_listing_item_name').text
-        price = item.find('span', class_='normal_price').text
-        link = item['href']
-        image = item.find('img')['src']
-        top_items.append({
-            'name': name,
-            'price': price,
-            'link': link,
-            'image': image
-        })
-    return top_items
+JOB_WORKERS = 4  # Scrapes running in the background at once
+INDEX_WAIT = 2.0  # Seconds the index page waits for a scrape before showing a loading page
+EXPORT_WAIT = 60.0  # Seconds a download waits for the scrape of each page
 
-@app.route('/')
-def index():
-    page = int(request.args.get('page', 1))
-    
-    top_items = scrape_steam_market(page)
-    
-    html = '''
-    <!doctype html>
-    <html lang="en">
-      <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1, shrink-to-fit=no">
-        <title>Steam Market Top Items</title>
-        <link rel="stylesheet" href="https://stackpath.bootstrapcdn.com/bootstrap/4.5.2/css/bootstrap.min.css">
-      </head>
-      <body>
-        <div class="container mt-5">
-          <h1 class="mb-4">Steam Market Top Items</h1>
-          <a href="/download/excel?page={{ page }}" class="btn btn-success mb-4">Download Excel</a>
-          <a href="/download/csv?page={{ page }}" class="btn btn-info mb-4">Download CSV</a>
-          <a href="/download/word?page={{ page }}" class="btn btn-primary mb-4">Download Word</a>
-          <div class="row">
-            {% for item in items %}
-              <div class="col-md-6 col-lg-4 mb-4">
-                <div class="card h-100">
-                  <img src="{{ item.image }}" class="card-img-top" alt="{{ item.name }}">
-                  <div class="card-body">
-                    <h5 class="card-title">{{ item.name }}</h5>
-                    <p class="card-text">Price: {{ item.price }}</p>
-                    <a href="{{ item.link }}" class="btn btn-primary" target="_blank">View on Steam</a>
-                  </div>
-                </div>
-              </div>
-            {% endfor %}
-          </div>
-          <nav aria-label="Page navigation">
-            <ul class="pagination">
-              {% if page > 1 %}
-              <li class="page-item">
-                <a class="page-link" href="/?page={{ page-1 }}" aria-label="Previous">
-                  <span aria-hidden="true">&laquo;</span>
-                </a>
-              </li>
-              {% endif %}
-              <li class="page-item"><a class="page-link" href="#">{{ page }}</a></li>
-              <li class="page-item">
-                <a class="page-link" href="/?page={{ page+1 }}" aria-label="Next">
-                  <span aria-hidden="true">&raquo;</span>
-                </a>
-              </li>
-            </ul>
-          </nav>
-        </div>
-      </body>
-    </html>
-    '''
-    
-    return render_template_string(html, items=top_items, page=page)
+# Scrapes run on background workers; requests only enqueue them and wait or poll
+job_queue = JobQueue(workers=JOB_WORKERS)
+atexit.register(job_queue.close)
 
-@app.route('/download/<file_type>')
-def download(file_type):
-    page = int(request.args.get('page', 1))
-    
-    top_items = scrape_steam_market(page)
-    
-    if file_type == 'excel':
-        return download_excel(top_items)
-    elif file_type == 'csv':
-        return download_csv(top_items)
-    elif file_type == 'word':
-        return download_word(top_items)
-    else:
-        return "Invalid file type requested.", 400
+STEAM_APPID = 730
+STEAM_CACHE_TTL = 300  # Seconds a scraped page is served from memory
+STEAM_FETCH_MODE = 'json'  # 'json' uses the market search endpoint, 'browser' always uses Selenium
+STEAM_COLUMNS = [('name', 'Name'), ('price', 'Price'), ('link', 'Link'), ('image', 'Image URL')]
+STEAM_COLUMN_WIDTHS = [30, 20, 50, 50]
+DOWNLOAD_MAX_PAGES = 20  # Upper bound for ?pages= on the download links
+WORD_MAX_ROWS = 5000  # Word tables are built in memory, longer exports are cut off
 
-def download_excel(data):
-    df = pd.DataFrame(data)
-    df.columns = ['Name', 'Price', 'Link', 'Image URL']
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False, sheet_name='Top Items')
-
-        # Get the xlsxwriter workbook and worksheet objects
-        workbook = writer.book
-        worksheet = writer.sheets['Top Items']
-
-        # Set the column width and format
-        worksheet.set_column('A:A', 30)  # Name column
-        worksheet.set_column('B:B', 20)  # Price column
-        worksheet.set_column('C:C', 50)  # Link column
-        worksheet.set_column('D:D', 50)  # Image URL column
-
-        # Add header format
-        header_format = workbook.add_format({
-            'bold': True,
-            'text_wrap': True,
-            'valign': 'top',
-            'fg_color': '#D7E4BC',
-            'border': 1,
-            'align': 'center'
-        })
-        
-        # Write the header
-        for col_num, value in enumerate(df.columns.values):
-            worksheet.write(0, col_num, value, header_format)
-        
-        # Add alternating row colors
-        row_formats = [
-            workbook.add_format({'bg_color': '#FFFFFF'}),
-            workbook.add_format({'bg_color': '#F3F3F3'})
-        ]
-        
-        for row_num, row_data in enumerate(df.values, 1):
-            row_format = row_formats[row_num % 2]
-            for col_num, cell_data in enumerate(row_data):
-                worksheet.write(row_num, col_num, cell_data, row_format)
-
-        # Add conditional formatting for the price column
-        price_format = workbook.add_format({
-            'bg_color': '#FFEB9C',
-            'font_color': '#9C5700'
-        })
-        worksheet.conditional_format('B2:B{}'.format(len(df) + 1), {'type': 'text', 'criteria': 'containing', 'value': 'USD', 'format': price_format})
-
-    output.seek(0)
-    return send_file(output, download_name='steam_market_top_items.xlsx', as_attachment=True)
+SNAPSHOT_PAGES = 5  # Pages kept pre-scraped in memory
+SNAPSHOT_INTERVAL = 300  # Seconds between snapshot refreshes, 0 disables the refresher
 
-def download_csv(data):
-    df = pd.DataFrame(data)
-    df.columns = ['Name', 'Price', 'Link', 'Image URL']
-    output = BytesIO()
-    df.to_csv(output, index=False)
-    output.seek(0)
-    return send_file(output, download_name='steam_market_top_items.csv', as_attachment=True)
+steam_cache = ResultCache(ttl=STEAM_CACHE_TTL)
 
-def download_word(data):
-    document = Document()
-    document.add_heading('Steam Market Top Items', 0).alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    
-    table = document.add_table(rows=1, cols=4)
-    table.style = 'Table Grid'
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = 'Name'
-    hdr_cells[1].text = 'Price'
-    hdr_cells[2].text = 'Link'
-    hdr_cells[3].text = 'Image URL'
-    
-    # Set header row style
-    hdr_cells[0].paragraphs[0].runs[0].bold = True
-    hdr_cells[1].paragraphs[0].runs[0].bold = True
-    hdr_cells[2].paragraphs[0].runs[0].bold = True
-    hdr_cells[3].paragraphs[0].runs[0].bold = True
-    
-    for item in data:
-        row_cells = table.add_row().cells
-        row_cells[0].text = item['name']
-        row_cells[1].text = item['price']
-        row_cells[2].text = item['link']
-        row_cells[3].text = item['image']
-    
-    # Add alternating row colors
-    for row in table.rows[1:]:
-        for cell in row.cells:
-            cell_paragraph = cell.paragraphs[0]
-            shading_elm_1 = OxmlElement('w:shd')
-            shading_elm_1.set(qn('w:fill'), 'F3F3F3')
-            cell_paragraph._element.get_or_add_tcPr().append(shading_elm_1)
-    
-    output = BytesIO()
-    document.save(output)
-    output.seek(0)
-    return send_file(output, download_name='steam_market_top_items.docx', as_attachment=True)
+# In browser mode every scrape needs Chrome, so the pool starts with the app; otherwise
+# it is warmed when the fallback is first used
+if STEAM_FETCH_MODE == 'browser':
+    driver_pool.warm_async()
 
-if __name__ == '__main__':
-    app.run(debug=True)
-from flask import Flask, render_template_string, send_file, request
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import pandas as pd
-import time
-from io import BytesIO
-from docx import Document
+def iter_steam_market(page, mode=None):
+    mode = mode or STEAM_FETCH_MODE
 
-app = Flask(__name__)
+    # The JSON search endpoint is much cheaper than a browser; only fall back when it fails
+    if mode == 'json':
+        data = steam_market.fetch_search_page(STEAM_APPID, page)
+        if data is not None:
+            yield from steam_market.iter_search_results(data)
+            return
 
-def scrape_steam_market(page):
-    options = Options()
-    options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
+    yield from iter_steam_market_browser(page)
 
-    service = Service('./chromedriver/chromedriver.exe')  # Update this with the actual path to your ChromeDriver
-    driver = webdriver.Chrome(service=service, options=options)
-    
+def scrape_steam_market(page, mode=None):
+    return list(iter_steam_market(page, mode))
+
+def iter_steam_market_browser(page):
     if page == 1:
         url = 'https://steamcommunity.com/market/search?appid=730'
     else:
         url = f'https://steamcommunity.com/market/search?appid=730#p{page}_popular_desc'
-    
-    driver.get(url)
 
+    # Borrow a warm browser from the pool instead of starting a new one. The first use
+    # starts the rest of the pool in the background, so later requests find one ready.
+    driver_pool.warm_async()
     try:
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, 'searchResultsRows'))
-        )
-    except Exception as e:
-        driver.quit()
-        return []
-
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
-    driver.quit()
-
-    results = soup.find('div', id='searchResultsRows')
-    top_items = []
-    for item in results.find_all('a', class_='market_listing_row_link'):
-        name = item.find('span', class_='market_listing_item_name').text
-        price = item.find('span', class_='normal_price').text
-        link = item['href']
-        image = item.find('img')['src']
-        top_items.append({
-            'name': name,
-            'price': price,
-            'link': link,
-            'image': image
-        })
-    return top_items
+        with driver_pool.driver() as driver:
+            start = time.perf_counter()
+            driver.get(url)
+
+            try:
+                rows = WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.ID, 'searchResultsRows'))
+                )
+            except TimeoutException:
+                rows = None
+            driver_pool.record_load(driver, time.perf_counter() - start)
+            if rows is None:
+                return
+
+            # Only the result rows are parsed, so only they are copied out of the browser
+            html = rows.get_attribute('outerHTML')
+    except (WebDriverException, TimeoutError):
+        return
+
+    yield from steam_market.iter_search_rows(html)
+
+LOADING_HTML = '''
+<!doctype html>
+<html lang="en">
+  <head>
+    <meta charset="utf-8">
+    <title>Steam Market Top Items</title>
+    <link rel="stylesheet" href="https://stackpath.bootstrapcdn.com/bootstrap/4.5.2/css/bootstrap.min.css">
+  </head>
+  <body>
+    <div class="container mt-5">
+      <h1 class="mb-4">Steam Market Top Items</h1>
+      {% if error %}
+      <p id="status">Fetching the items failed: {{ error }}</p>
+    </div>
+    {% else %}
+      <p id="status">Fetching items from the Steam market&hellip;</p>
+    </div>
+    <script>
+      // Load the items once the scrape has finished
+      function poll() {
+        fetch('{{ job_url }}').then(r => r.json()).then(job => {
+          if (job.status === 'done') { location.href = '{{ page_url }}'; }
+          else if (job.status === 'failed') { document.getElementById('status').textContent = 'Fetching the items failed: ' + job.error; }
+          else { setTimeout(poll, 1000); }
+        });
+      }
+      setTimeout(poll, 1000);
+    </script>
+    {% endif %}
+  </body>
+</html>
+'''
+
+# The first pages are re-scraped in the background and served from memory, so page
+# views and downloads of those pages don't wait for Steam at all
+snapshot_store = SnapshotStore(STEAM_COLUMNS)
+snapshot_refresher = SnapshotRefresher(snapshot_store, lambda page: scrape_steam_market(page),
+                                       pages=SNAPSHOT_PAGES, interval=SNAPSHOT_INTERVAL)
+atexit.register(snapshot_refresher.stop)
+
+def format_age(seconds):
+    if seconds < 60:
+        return f"{int(seconds)} seconds ago"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} minutes ago"
+    return f"{int(seconds // 3600)} hours ago"
+
+def get_top_items(page):
+    # The index page and the download links share one scrape per page
+    return steam_cache.get_or_compute(steam_key(STEAM_APPID, page), lambda: scrape_steam_market(page))
+
+def submit_top_items(page):
+    # Identical pending scrapes share one job
+    return job_queue.submit(steam_key(STEAM_APPID, page), lambda: get_top_items(page))
+
+def export_page(number):
+    # Items of one page for a download, or None when its scrape failed or took longer than EXPORT_WAIT
+    items, _ = snapshot_store.page(number)
+    if items is not None:
+        return items
+    job = submit_top_items(number)
+    try:
+        return job.wait(EXPORT_WAIT)
+    except Exception:
+        if job.done():
+            print(f"Scraping page {number} for a download failed: {job.error!r}")
+        else:
+            print(f"Scraping page {number} for a download took longer than {EXPORT_WAIT:.0f} seconds.")
+        return None
+
+def iter_export_items(page, pages=1, first_items=None):
+    # Items of `pages` consecutive pages, scraped one page at a time as the download is
+    # written. A page that fails ends the download there instead of breaking the stream.
+    for number in range(page, page + pages):
+        items = first_items if number == page and first_items is not None else export_page(number)
+        if not items:
+            return
+        yield from items
 
 @app.route('/')
 def index():
     page = int(request.args.get('page', 1))
+    snapshot_refresher.start()
     
-    top_items = scrape_steam_market(page)
+    # Served from the snapshot or the cache when possible, otherwise wait briefly for the
+    # background scrape and hand out a page that polls the job if it takes longer
+    top_items, age = snapshot_store.page(page)
+    if top_items is None:
+        top_items = steam_cache.get(steam_key(STEAM_APPID, page))
+    finished = job_queue.get(request.args.get('job', ''))
+    if top_items is None and finished is not None and finished.done() and finished.error is None:
+        # Coming back from the loading page; empty results aren't cached, so use the job's
+        top_items = finished.result
+    if top_items is None:
+        job = submit_top_items(page)
+        try:
+            top_items = job.wait(INDEX_WAIT)
+        except Exception:
+            if job.done():
+                return render_template_string(LOADING_HTML, error=repr(job.error)), 502
+            return render_template_string(LOADING_HTML, job_url=url_for('job_status', job_id=job.id),
+                                          page_url=url_for('index', page=page, job=job.id)), 202
     
     html = '''
     <!doctype html>
@@ -308,8 +218,11 @@ def index():
       <body>
         <div class="container mt-5">
           <h1 class="mb-4">Steam Market Top Items</h1>
+          {% if age %}<p class="text-muted">Prices as of {{ age }}</p>{% endif %}
           <a href="/download/excel?page={{ page }}" class="btn btn-success mb-4">Download Excel</a>
           <a href="/download/csv?page={{ page }}" class="btn btn-info mb-4">Download CSV</a>
+          <a href="/download/ndjson?page={{ page }}" class="btn btn-secondary mb-4">Download NDJSON</a>
+          <a href="/download/parquet?page={{ page }}" class="btn btn-dark mb-4">Download Parquet</a>
           <a href="/download/word?page={{ page }}" class="btn btn-primary mb-4">Download Word</a>
           <div class="row">
             {% for item in items %}
@@ -347,59 +260,137 @@ def index():
     </html>
     '''
     
-    return render_template_string(html, items=top_items, page=page)
+    return render_template_string(html, items=top_items, page=page, age=format_age(age) if age is not None else None)
 
 @app.route('/download/<file_type>')
 def download(file_type):
+    # Checked before anything is scraped, so a bad link doesn't cost a market request
+    download_file = DOWNLOADS.get(file_type)
+    if download_file is None:
+        return "Invalid file type requested.", 400
+
     page = int(request.args.get('page', 1))
+    pages = max(1, min(int(request.args.get('pages', 1)), DOWNLOAD_MAX_PAGES))
+    snapshot_refresher.start()
     
-    top_items = scrape_steam_market(page)
+    # The first page is fetched before the response starts, so a failed scrape is an error
+    # status instead of an empty file
+    first_items = export_page(page)
+    if first_items is None:
+        return "Fetching the items from the Steam market failed, please try again later.", 502
+
+    # A generator, so the streamed formats can send the first page before the last is scraped
+    top_items = iter_export_items(page, pages, first_items)
+    response = download_file(top_items)
     
-    if file_type == 'excel':
-        return download_excel(top_items)
-    elif file_type == 'csv':
-        return download_csv(top_items)
-    elif file_type == 'word':
-        return download_word(top_items)
-    else:
-        return "Invalid file type requested.", 400
+    _, age = snapshot_store.page(page)
+    if age is not None:
+        response.headers['X-Snapshot-Age'] = str(int(age))
+    return response
+
+@app.route('/scrape', methods=['GET', 'POST'])
+def scrape():
+    # Start (or join) the scrape of a page without waiting for it
+    page = int(request.args.get('page', 1))
+    job = submit_top_items(page)
+    return jsonify(job.to_dict()), 202, {'Location': url_for('job_status', job_id=job.id)}
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/stats/jobs')
+def job_stats():
+    return jsonify(job_queue.stats())
+
+@app.route('/stats/snapshot')
+def snapshot_stats():
+    return jsonify(snapshot_refresher.stats())
+
+@app.route('/stats/pool')
+def pool_stats():
+    return jsonify(driver_pool.stats())
+
+@app.route('/stats/cache')
+def cache_stats():
+    return jsonify(steam_cache.stats())
+
+@app.route('/stats/http')
+def http_stats():
+    return jsonify(http_session.host_stats())
+
+@app.route('/stats/http-cache')
+def http_cache_stats():
+    cache = response_cache.get_cache()
+    return jsonify(cache.stats() if cache else {'mode': 'off'})
+
+def temp_path(suffix):
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return path
+
+def send_temp_file(path, download_name):
+    # The file is on disk instead of in RAM, and removed once the response is sent
+    response = send_file(path, download_name=download_name, as_attachment=True)
+    # Without passthrough the file is sent through the response's closing iterator,
+    # which closes it and then runs the cleanup
+    response.direct_passthrough = False
+    response.call_on_close(lambda: os.remove(path))
+    return response
 
 def download_excel(data):
-    df = pd.DataFrame(data)
-    df.columns = ['Name', 'Price', 'Link', 'Image URL']
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False)
-    output.seek(0)
-    return send_file(output, download_name='steam_market_top_items.xlsx', as_attachment=True)
+    # Every cell is written once; the banding and the USD highlight are conditional formats.
+    # The workbook is spooled to a temp file with constant_memory, so only one row is in RAM.
+    path = temp_path('.xlsx')
+    try:
+        with ExcelStreamWriter(path, STEAM_COLUMNS, sheet_name='Top Items', widths=STEAM_COLUMN_WIDTHS, banded=True, highlight=('price', 'USD')) as writer:
+            writer.write(data)
+    except Exception:
+        os.remove(path)
+        raise
+    return send_temp_file(path, 'steam_market_top_items.xlsx')
 
 def download_csv(data):
-    df = pd.DataFrame(data)
-    df.columns = ['Name', 'Price', 'Link', 'Image URL']
-    output = BytesIO()
-    df.to_csv(output, index=False)
-    output.seek(0)
-    return send_file(output, download_name='steam_market_top_items.csv', as_attachment=True)
+    # Streamed as a chunked response while the pages are scraped
+    headers = {'Content-Disposition': 'attachment; filename=steam_market_top_items.csv'}
+    return Response(iter_csv(data, STEAM_COLUMNS), mimetype='text/csv', headers=headers)
+
+def download_ndjson(data):
+    headers = {'Content-Disposition': 'attachment; filename=steam_market_top_items.ndjson'}
+    return Response(iter_ndjson(data, STEAM_COLUMNS), mimetype='application/x-ndjson', headers=headers)
+
+def download_parquet(data):
+    # Typed, zstd-compressed columns; written to a temp file since Parquet's footer comes last
+    path = temp_path('.parquet')
+    try:
+        with ParquetStreamWriter(path, STEAM_COLUMNS) as writer:
+            writer.write(data)
+    except Exception:
+        os.remove(path)
+        raise
+    return send_temp_file(path, 'steam_market_top_items.parquet')
 
 def download_word(data):
-    document = Document()
-    document.add_heading('Steam Market Top Items', 0)
-    table = document.add_table(rows=1, cols=4)
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = 'Name'
-    hdr_cells[1].text = 'Price'
-    hdr_cells[2].text = 'Link'
-    hdr_cells[3].text = 'Image URL'
-    for item in data:
-        row_cells = table.add_row().cells
-        row_cells[0].text = item['name']
-        row_cells[1].text = item['price']
-        row_cells[2].text = item['link']
-        row_cells[3].text = item['image']
-    output = BytesIO()
-    document.save(output)
-    output.seek(0)
-    return send_file(output, download_name='steam_market_top_items.docx', as_attachment=True)
+    # One pass over the rows; banding comes from the table style instead of per-cell shading
+    path = temp_path('.docx')
+    try:
+        with WordStreamWriter(path, STEAM_COLUMNS, title='Steam Market Top Items', max_rows=WORD_MAX_ROWS) as writer:
+            writer.write(data)
+    except Exception:
+        os.remove(path)
+        raise
+    return send_temp_file(path, 'steam_market_top_items.docx')
+
+DOWNLOADS = {
+    'excel': download_excel,
+    'csv': download_csv,
+    'ndjson': download_ndjson,
+    'parquet': download_parquet,
+    'word': download_word,
+}
 
 if __name__ == '__main__':
     app.run(debug=True)
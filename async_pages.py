@@ -0,0 +1,222 @@
+import asyncio
+import re
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import httpx
+
+import http_session
+import response_cache
+from rate_limit import backoff_delay, retry_after_seconds
+
+class HostLimiter:
+    # Politeness limiter: spaces out request starts to the same host by `delay` seconds,
+    # while requests to different hosts don't wait on each other
+    def __init__(self, delay):
+        self.delay = delay
+        self._next_slot = {}
+
+    async def wait(self, url):
+        host = urlsplit(url).netloc
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = start + self.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+class CrawlStatus:
+    # Filled in by a crawl for whoever consumes its pages: the number of pages that
+    # couldn't be fetched, and whether the crawl got to the last results page
+    def __init__(self):
+        self.failed = 0
+        self.complete = False
+
+    def finished(self):
+        # Every page of the results was crawled without errors
+        return self.complete and not self.failed
+
+def max_page_number(soup, pattern):
+    # Highest page number referenced by any link on the page, e.g. in the pagination bar
+    regex = re.compile(pattern)
+    numbers = [int(match.group(1)) for link in soup.find_all('a', href=True) for match in [regex.search(link['href'])] if match]
+    return max(numbers) if numbers else None
+
+async def fetch_page(client, url, semaphore, limiter, retries=None):
+    # Returns the page body (bytes) or None. Goes through the same on-disk response
+    # cache as http_session.get() and uses the same retry policy: 429/5xx and connection
+    # errors are retried with jittered backoff, and every attempt is counted in the
+    # per-host stats. The cache's SQLite calls run on a thread so the other fetches on
+    # the loop carry on meanwhile.
+    cache = response_cache.get_cache()
+    page = None
+    headers = {}
+    if cache is not None:
+        key = response_cache.normalize_url(url)
+        page = await asyncio.to_thread(cache.lookup, key)
+        if cache.mode == 'replay' or (page is not None and page.is_fresh(cache.max_age)):
+            if page is None:
+                print(f"Failed to retrieve {url}: not in the response cache")
+                return None
+            return page.body
+        if page is not None:
+            headers = page.conditional_headers()
+
+    retries = http_session.MAX_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        async with semaphore:
+            await limiter.wait(url)
+            start = time.monotonic()
+            try:
+                response = await client.get(url, headers=headers)
+            except httpx.TransportError as e:
+                http_session.record(url, time.monotonic() - start, retried=attempt > 0)
+                if attempt == retries:
+                    print(f"Failed to retrieve {url}: {e}")
+                    return None
+                response = None
+            else:
+                http_session.record(url, time.monotonic() - start, response.status_code, retried=attempt > 0)
+
+        if response is not None and (response.status_code not in http_session.RETRY_STATUSES or attempt == retries):
+            break
+        delay = retry_after_seconds(response) or backoff_delay(attempt, base=http_session.BACKOFF_BASE, cap=http_session.MAX_BACKOFF)
+        await asyncio.sleep(min(delay, http_session.MAX_BACKOFF))
+
+    if response.status_code == 304 and page is not None:
+        await asyncio.to_thread(cache.mark_revalidated, page)
+        return page.body
+    if response.status_code != 200:
+        print(f"Failed to retrieve {url}. Status code: {response.status_code}")
+        return None
+    if cache is not None:
+        await asyncio.to_thread(cache.store, key, str(response.url), response.status_code, response.headers, response.content)
+    return response.content
+
+class HostScheduler:
+    # Shared by every crawl on one event loop: caps the requests in flight per host and
+    # spaces out their starts, whichever crawl they belong to. asyncio semaphores wake
+    # waiters in FIFO order, so crawls of the same host take turns page by page.
+    def __init__(self, concurrency=4, delay=1.0, host_concurrency=None):
+        self.concurrency = concurrency
+        self.host_concurrency = host_concurrency or {}
+        self.limiter = HostLimiter(delay)
+        self._semaphores = {}
+
+    def semaphore(self, url):
+        host = urlsplit(url).netloc
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.host_concurrency.get(host, self.concurrency))
+            self._semaphores[host] = semaphore
+        return semaphore
+
+    def limit(self, url):
+        return self.host_concurrency.get(urlsplit(url).netloc, self.concurrency)
+
+def open_client(connections, timeout=None):
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    connect_timeout, read_timeout = timeout or http_session.DEFAULT_TIMEOUT
+    timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+    return httpx.AsyncClient(headers=http_session.DEFAULT_HEADERS, follow_redirects=True, timeout=timeout, limits=limits)
+
+async def crawl_with(client, scheduler, first_url, parse_page, page_url=None, max_pages=None, prefetch=None, pool=None, status=None):
+    # Async generator yielding each page's items in page order as soon as that page is
+    # parsed. Requests go through the scheduler's slots for the host of first_url. With a
+    # parse_pool.ParsePool the pages are parsed in worker processes, which needs a
+    # picklable parse_page. A CrawlStatus passed as status tells afterwards whether pages
+    # failed or max_pages cut the crawl short.
+    status = status or CrawlStatus()
+    semaphore = scheduler.semaphore(first_url)
+    limiter = scheduler.limiter
+    prefetch = prefetch or scheduler.limit(first_url) * 2
+
+    async def parse(html):
+        # parse_page returns (items, last page number or None, next page URL or None)
+        if pool is None:
+            return parse_page(html)
+        return await pool.parse(parse_page, html)
+
+    async def fetch_and_parse(url):
+        # Each prefetched page is parsed as soon as it arrives, so the pool works on
+        # several pages while the caller is still consuming an earlier one
+        html = await fetch_page(client, url, semaphore, limiter)
+        return None if html is None else await parse(html)
+
+    html = await fetch_page(client, first_url, semaphore, limiter)
+    if html is None:
+        status.failed += 1
+        return
+
+    items, last_page, next_url = await parse(html)
+    yield items
+
+    if page_url and last_page:
+        # The URL pattern is known, so the following pages are requested ahead of time,
+        # at most `prefetch` at once so unconsumed pages don't pile up in memory
+        complete = not max_pages or last_page <= max_pages
+        if max_pages:
+            last_page = min(last_page, max_pages)
+        numbers = iter(range(2, last_page + 1))
+        pending = deque()
+
+        def fill():
+            while len(pending) < prefetch:
+                number = next(numbers, None)
+                if number is None:
+                    return
+                pending.append(asyncio.create_task(fetch_and_parse(page_url(number))))
+
+        try:
+            fill()
+            while pending:
+                parsed = await pending.popleft()
+                fill()
+                if parsed is None:
+                    status.failed += 1
+                else:
+                    yield parsed[0]
+            status.complete = complete
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    else:
+        # Fall back to following the "next" links one by one
+        fetched = 1
+        while next_url and (not max_pages or fetched < max_pages):
+            parsed = await fetch_and_parse(next_url)
+            if parsed is None:
+                status.failed += 1
+                return
+            items, _, next_url = parsed
+            fetched += 1
+            yield items
+        status.complete = not next_url
+
+async def crawl_pages_async(first_url, parse_page, page_url=None, max_pages=None, concurrency=4, delay=1.0, timeout=None, pool=None, status=None):
+    # A single crawl with its own client and scheduler
+    scheduler = HostScheduler(concurrency, delay)
+    async with open_client(concurrency, timeout) as client:
+        pages = crawl_with(client, scheduler, first_url, parse_page, page_url, max_pages, pool=pool, status=status)
+        try:
+            async for items in pages:
+                yield items
+        finally:
+            await pages.aclose()
+
+def iter_crawl(first_url, parse_page, page_url=None, max_pages=None, concurrency=4, delay=1.0, timeout=None, pool=None, status=None):
+    # Synchronous wrapper around crawl_pages_async(). The event loop only runs while the
+    # caller asks for the next page, so a slow consumer holds back further fetching.
+    loop = asyncio.new_event_loop()
+    pages = crawl_pages_async(first_url, parse_page, page_url, max_pages, concurrency, delay, timeout, pool, status)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(pages.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(pages.aclose())
+        loop.close()
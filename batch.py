@@ -0,0 +1,150 @@
+import os
+import csv
+import time
+import asyncio
+import argparse
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import http_session
+import response_cache
+from async_pages import HostScheduler, crawl_with, open_client
+from engine import open_writers, query_slug
+from exporters import FORMAT_CHOICES, write_stream
+from parse_pool import ParsePool
+from price_history import PriceHistory
+from prices import normalize_rows
+from sites import ADAPTERS, get_adapter
+
+# Pages a query requests ahead of the one it is parsing. Kept small so the queries of
+# one host take turns instead of the first query claiming every slot.
+BATCH_PREFETCH = 2
+
+def read_queries(path, max_pages=None):
+    # One query per line as "site,query[,max pages]", e.g. "bol,gaming laptop,3".
+    # Blank lines and lines starting with # are skipped. Returns [(adapter, query, max_pages)].
+    queries = []
+    seen = set()
+    with open(path, newline='', encoding='utf-8') as f:
+        for number, row in enumerate(csv.reader(f), 1):
+            if not row or not row[0].strip() or row[0].lstrip().startswith('#'):
+                continue
+            site = row[0].strip()
+            if site not in ADAPTERS:
+                print(f"Line {number}: unknown site '{site}', skipped.")
+                continue
+            adapter = get_adapter(site)
+            query = (row[1].strip() if len(row) > 1 else '') or adapter.default_query
+            try:
+                pages = int(row[2]) if len(row) > 2 and row[2].strip() else max_pages
+            except ValueError:
+                print(f"Line {number}: '{row[2]}' is not a page count, skipped.")
+                continue
+            # The output files are named after the site and query, so run each pair once
+            if (site, query) in seen:
+                print(f"Line {number}: {site} '{query}' is listed twice, skipped.")
+                continue
+            seen.add((site, query))
+            queries.append((adapter, query, pages))
+    return queries
+
+async def run_query(client, scheduler, adapter, query, max_pages, choice, directory, timestamp, history=None, pool=None):
+    # Crawls one query into its own files and returns the number of rows saved. The files
+    # are only created once the first page has rows.
+    name = f'{query_slug(query) or "all"}_{timestamp}'
+    pages = crawl_with(client, scheduler, adapter.first_url(query), adapter.page_parser(pool), adapter.page_urls(query), max_pages,
+                       prefetch=BATCH_PREFETCH, pool=pool)
+    writers = []
+    total = 0
+    try:
+        async for items in pages:
+            if not items:
+                continue
+            # Normalizing and recording are CPU and SQLite work, kept off the event loop so the
+            # other queries' requests keep going
+            rows = await asyncio.to_thread(normalize_rows, items, default_currency=adapter.currency)
+            if not writers:
+                os.makedirs(directory, exist_ok=True)
+                writers = open_writers(adapter, choice, directory, name)
+            total += write_stream(rows, writers)
+            if history:
+                await asyncio.to_thread(history.record, adapter.history_source or adapter.name, rows, adapter.key_field, title_field=adapter.title_field)
+    finally:
+        await pages.aclose()
+        for writer in writers:
+            writer.close()
+    return total
+
+async def run_batch(queries, choice, output_dir=None, concurrency=2, delay=1.0, host_concurrency=None, history=None, timeout=None, pool=None):
+    # Runs every query at once through one client and one scheduler. Each host gets at
+    # most `concurrency` requests in flight and one request start per `delay` seconds,
+    # shared by all queries for that host, so the wall time grows with the number of
+    # pages per host rather than with the number of queries. With a ParsePool the pages
+    # are parsed in worker processes while the loop keeps fetching. Returns
+    # {(site, query): rows saved, or None when the query failed}.
+    scheduler = HostScheduler(concurrency, delay, host_concurrency)
+    hosts = {urlsplit(adapter.first_url(query)).netloc for adapter, query, _ in queries}
+    connections = sum(scheduler.limit(f'//{host}') for host in hosts) or concurrency
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    async with open_client(connections, timeout) as client:
+        async def run(adapter, query, max_pages):
+            start = time.perf_counter()
+            try:
+                total = await run_query(client, scheduler, adapter, query, max_pages, choice, output_dir or adapter.directory, timestamp, history, pool)
+            except Exception as e:
+                print(f"{adapter.name} '{query}' failed: {e}")
+                return None
+            print(f"{adapter.name:<12} {query!r}: {total} rows in {time.perf_counter() - start:.1f}s")
+            return total
+
+        results = await asyncio.gather(*(run(*query) for query in queries))
+    return {(adapter.name, query): total for (adapter, query, _), total in zip(queries, results)}
+
+def parse_host_limits(values):
+    # ["www.bol.com=2", ...] -> {"www.bol.com": 2}
+    limits = {}
+    for value in values or []:
+        host, _, limit = value.partition('=')
+        limits[host.strip()] = int(limit)
+    return limits
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run many searches across the supported sites in one go.',
+                                     epilog='Query file lines look like "bol,gaming laptop,3" (site, query, optional max pages). '
+                                            f"Sites: {', '.join(sorted(ADAPTERS))}.")
+    parser.add_argument('queries', help='File with one site,query[,max pages] per line')
+    parser.add_argument('--format', choices=FORMAT_CHOICES, default='csv', help='Output format for every query')
+    parser.add_argument('--max-pages', type=int, default=1, help='Pages per query when the file gives none (0 crawls every page)')
+    parser.add_argument('--concurrency', type=int, default=2, help='Requests in flight per host, shared by all queries')
+    parser.add_argument('--host-limit', action='append', metavar='HOST=N', help='Different concurrency for one host, e.g. www.bol.com=1')
+    parser.add_argument('--delay', type=float, default=1.0, help='Minimum seconds between requests to the same host')
+    parser.add_argument('--parse-workers', type=int, default=os.cpu_count() or 1, help='Worker processes parsing the pages (0 parses on the fetching thread)')
+    parser.add_argument('--output-dir', help="Directory for the files (defaults to each site's own, e.g. Bol_Data)")
+    parser.add_argument('--no-history', action='store_true', help='Do not add the prices to the price history')
+    parser.add_argument('--cache', choices=response_cache.CACHE_MODES, help=response_cache.CACHE_HELP)
+    args = parser.parse_args()
+    response_cache.configure(mode=args.cache)
+
+    queries = read_queries(args.queries, args.max_pages or None)
+    if not queries:
+        print("No queries to run.")
+    else:
+        history = None if args.no_history else PriceHistory()
+        pool = ParsePool(args.parse_workers) if args.parse_workers else None
+        start = time.perf_counter()
+        try:
+            results = asyncio.run(run_batch(queries, args.format, args.output_dir, args.concurrency, args.delay,
+                                            parse_host_limits(args.host_limit), history, pool=pool))
+        finally:
+            if history:
+                history.close()
+            if pool:
+                pool.close()
+        elapsed = time.perf_counter() - start
+
+        failed = sum(total is None for total in results.values())
+        rows = sum(total or 0 for total in results.values())
+        print(f"{len(results)} queries, {rows} rows, {failed} failed in {elapsed:.1f}s.")
+        for host, stats in sorted(http_session.host_stats().items()):
+            print(f"  {host}: {stats['requests']} requests, {stats['retries']} retries, {stats['avg_latency'] * 1000:.0f} ms average")
@@ -0,0 +1,92 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import warnings
+from io import BytesIO
+
+import common  # noqa: F401  (puts the repository root on sys.path)
+
+import pandas as pd
+
+from exporters import HEADER_FORMAT, ExcelStreamWriter
+
+COLUMNS = [('name', 'Name'), ('price', 'Price'), ('link', 'Link'), ('image', 'Image URL')]
+WIDTHS = [30, 20, 50, 50]
+
+def make_rows(count):
+    return [{
+        'name': f'AK-47 | Redline (Field-Tested) #{i}',
+        'price': f'${i % 500}.{i % 100:02d} USD',
+        'link': f'https://steamcommunity.com/market/listings/730/item%20{i}',
+        'image': f'https://community.cloudflare.steamstatic.com/economy/image/{i}/62fx62f',
+    } for i in range(count)]
+
+def legacy_export(rows, path):
+    # The old download_excel: to_excel, then every cell written again to colour the rows.
+    # pandas also turns the links into hyperlinks, which stops past Excel's 65,530 URL limit.
+    df = pd.DataFrame(rows)
+    df.columns = [header for _, header in COLUMNS]
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='Top Items')
+        workbook = writer.book
+        worksheet = writer.sheets['Top Items']
+        for col_num, width in enumerate(WIDTHS):
+            worksheet.set_column(col_num, col_num, width)
+        header_format = workbook.add_format(HEADER_FORMAT)
+        for col_num, value in enumerate(df.columns.values):
+            worksheet.write(0, col_num, value, header_format)
+        row_formats = [workbook.add_format({'bg_color': '#FFFFFF'}), workbook.add_format({'bg_color': '#F3F3F3'})]
+        for row_num, row_data in enumerate(df.values, 1):
+            row_format = row_formats[row_num % 2]
+            for col_num, cell_data in enumerate(row_data):
+                worksheet.write(row_num, col_num, cell_data, row_format)
+        price_format = workbook.add_format({'bg_color': '#FFEB9C', 'font_color': '#9C5700'})
+        worksheet.conditional_format('B2:B{}'.format(len(df) + 1), {'type': 'text', 'criteria': 'containing', 'value': 'USD', 'format': price_format})
+    output.seek(0)
+    with open(path, 'wb') as f:
+        f.write(output.read())
+
+def stream_export(rows, path, constant_memory=True):
+    with ExcelStreamWriter(path, COLUMNS, sheet_name='Top Items', widths=WIDTHS, banded=True,
+                           highlight=('price', 'USD'), constant_memory=constant_memory) as writer:
+        writer.write(rows)
+
+def measure(export, rows, path, memory):
+    start = time.perf_counter()
+    export(rows, path)
+    elapsed = time.perf_counter() - start
+
+    # tracemalloc slows the export down several times, so memory is a separate run
+    peak = None
+    if memory:
+        tracemalloc.start()
+        export(rows, path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak, os.path.getsize(path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the old per-cell Excel export with the shared stream writer.')
+    parser.add_argument('--rows', type=int, default=100000, help='Number of rows to export')
+    parser.add_argument('--memory', action='store_true', help='Also measure peak Python memory (slow)')
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    cases = [
+        ('legacy (per cell)', legacy_export),
+        ('stream', lambda rows, path: stream_export(rows, path, constant_memory=False)),
+        ('stream, constant_memory', stream_export),
+    ]
+    print(f"{'Export':<26}{'seconds':>9}{'peak MiB':>10}{'file MiB':>10}")
+    with tempfile.TemporaryDirectory() as directory, warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for name, export in cases:
+            elapsed, peak, size = measure(export, rows, os.path.join(directory, 'export.xlsx'), args.memory)
+            memory = f"{peak / 2**20:.1f}" if peak is not None else 'n/a'
+            print(f"{name:<26}{elapsed:>9.2f}{memory:>10}{size / 2**20:>10.1f}")
+
+if __name__ == '__main__':
+    main()
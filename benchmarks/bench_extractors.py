@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from common import ROOT, load_script, read_fixture
+
+import bol
+import marktplaats
+import steam_market
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+def peak_alloc_mib(extract, page):
+    # Largest amount of memory allocated at once during a single parse. Measured per case,
+    # unlike the process RSS, which only ever grows; and on a separate parse, since
+    # tracing slows down every allocation.
+    tracemalloc.start()
+    extract(page)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+def percentile(sorted_values, fraction):
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+def build_cases():
+    # The get_/scrape_ functions fetch and then hand the page to these parse functions,
+    # which are the part that runs offline against the fixtures
+    amazon = load_script('amazon.py', 'amazon_com')
+    amazon_nl = load_script('amazon.nl.py', 'amazon_nl')
+    amazon_items = load_script('amazon.items.py', 'amazon_items')
+    return [
+        ('amazon.com product', 'amazon_product.html', amazon.parse_amazon_product_details),
+        ('amazon.nl product', 'amazon_product.html', amazon_nl.parse_amazon_product_details),
+        ('amazon.nl search', 'amazon_search.html', lambda html: list(amazon_items.parse_amazon_search_results(html))),
+        ('amazon.nl details', 'amazon_product.html', amazon_items.parse_amazon_product_details),
+        ('bol.com search', 'bol_search.html', bol.parse_bol_page),
+        ('marktplaats search', 'marktplaats_search.html', marktplaats.parse_marktplaats_page),
+        ('steam html', 'steam_search.html', lambda html: list(steam_market.iter_search_rows(html))),
+        ('steam json', 'steam_search_render.json', lambda raw: steam_market.parse_search_results(json.loads(raw))),
+    ]
+
+def run_case(extract, page, iterations):
+    extract(page)  # Warm up imports and caches
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        extract(page)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        'pages_per_sec': iterations / sum(timings),
+        'p50_ms': percentile(timings, 0.50) * 1000,
+        'p99_ms': percentile(timings, 0.99) * 1000,
+        'peak_alloc_mib': peak_alloc_mib(extract, page),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every extraction function against the saved fixtures.')
+    parser.add_argument('--iterations', type=int, default=50, help='Parses per case')
+    parser.add_argument('--only', help='Run only cases whose name contains this text')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='JSON file with p50 timings to compare against. The committed one was recorded on the reference '
+                             'machine; on other hardware record one first with --save-baseline.')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Fail when a p50 exceeds the baseline by this factor')
+    parser.add_argument('--min-ms', type=float, default=1.0, help='Only fail on cases whose baseline p50 is at least this long; shorter ones are mostly timer noise')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    elif not args.save_baseline:
+        print(f"No baseline at {args.baseline}, nothing to compare against; record one with --save-baseline.")
+
+    results = {}
+    regressions = []
+    print(f"{'Case':<20}{'pages/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'peak MiB':>10}{'vs baseline':>13}")
+    for name, fixture, extract in build_cases():
+        if args.only and args.only not in name:
+            continue
+        result = run_case(extract, read_fixture(fixture), args.iterations)
+        results[name] = result
+
+        ratio = ''
+        if name in baseline:
+            factor = result['p50_ms'] / baseline[name]['p50_ms']
+            ratio = f"{factor:.2f}x"
+            if factor > args.threshold and baseline[name]['p50_ms'] >= args.min_ms:
+                regressions.append((name, factor))
+        print(f"{name:<20}{result['pages_per_sec']:>10.1f}{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}{result['peak_alloc_mib']:>10.2f}{ratio:>13}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if regressions:
+        for name, factor in regressions:
+            print(f"Regression: {name} is {factor:.2f}x slower than the baseline (threshold {args.threshold:.2f}x)")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import asyncio
+import os
+import time
+
+from common import read_fixture
+
+from parse_pool import ParsePool
+from sites import get_adapter
+
+PAGES = [('bol', 'bol_search.html'), ('marktplaats', 'marktplaats_search.html'), ('amazon.nl', 'amazon_search.html')]
+
+def parse_inline(pages):
+    return sum(len(get_adapter(site).parse_page(body)[0]) for site, body in pages)
+
+async def parse_pooled(pages, pool):
+    # The way crawl_with() uses the pool: every fetched page is handed over at once and
+    # the pool's slots decide how many are in flight
+    results = await asyncio.gather(*(pool.parse(get_adapter(site).page_parser(pool), body) for site, body in pages))
+    return sum(len(items) for items, _, _ in results)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare parsing result pages in the main process and in a process pool.')
+    parser.add_argument('--pages', type=int, default=300, help='Number of result pages to parse')
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, os.cpu_count() or 1], help='Pool sizes to try')
+    args = parser.parse_args()
+
+    fixtures = [(site, read_fixture(name)) for site, name in PAGES]
+    pages = [fixtures[i % len(fixtures)] for i in range(args.pages)]
+    print(f"{os.cpu_count()} CPUs, {args.pages} pages")
+
+    start = time.perf_counter()
+    rows = parse_inline(pages)
+    elapsed = time.perf_counter() - start
+    print(f"{'inline':<12}{elapsed:>8.2f} s{args.pages / elapsed:>10.1f} pages/s{rows:>8} rows")
+
+    for workers in sorted(set(args.workers)):
+        with ParsePool(workers) as pool:
+            asyncio.run(parse_pooled(pages[:workers], pool))  # Start the workers and warm their imports
+            start = time.perf_counter()
+            rows = asyncio.run(parse_pooled(pages, pool))
+            elapsed = time.perf_counter() - start
+        print(f"{f'{workers} workers':<12}{elapsed:>8.2f} s{args.pages / elapsed:>10.1f} pages/s{rows:>8} rows")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import time
+import tracemalloc
+
+from common import load_script, read_fixture
+
+from bs4 import BeautifulSoup
+
+import bol
+import marktplaats
+import steam_market
+from parsing import parse_html
+from sites import get_adapter
+
+def measure(parse, html, repeat):
+    # Peak memory of one parse (tree included), then the average time over `repeat` parses
+    tracemalloc.start()
+    soup = parse(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del soup
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse(html)
+    return (time.perf_counter() - start) / repeat, peak
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare full html.parser trees with full and strained lxml trees on the saved fixtures.')
+    parser.add_argument('--repeat', type=int, default=20, help='Parses per fixture and parser')
+    args = parser.parse_args()
+
+    amazon_items = load_script('amazon.items.py', 'amazon_items')
+    cases = [
+        ('bol.com', 'bol_search.html', bol.BOL_STRAINER),
+        ('Marktplaats', 'marktplaats_search.html', marktplaats.MARKTPLAATS_STRAINER),
+        ('Amazon search', 'amazon_search.html', get_adapter('amazon.nl').strainer),
+        ('Amazon product', 'amazon_product.html', amazon_items.PRODUCT_STRAINER),
+        ('Steam market', 'steam_search.html', steam_market.SEARCH_ROWS_STRAINER),
+    ]
+
+    # The total speedup splits into the lxml backend (full trees) and the strainer (strained
+    # vs full lxml tree); the strainer only helps as much as the page has outside the kept parts
+    print(f"{'Site':<16}{'before ms':>11}{'lxml ms':>9}{'after ms':>10}{'lxml':>7}{'strainer':>10}{'total':>8}{'before KiB':>12}{'after KiB':>11}")
+    for site, filename, strainer in cases:
+        html = read_fixture(filename)
+        before_time, before_peak = measure(lambda markup: BeautifulSoup(markup, 'html.parser'), html, args.repeat)
+        full_time, _ = measure(lambda markup: parse_html(markup), html, args.repeat)
+        after_time, after_peak = measure(lambda markup: parse_html(markup, strainer), html, args.repeat)
+        print(f"{site:<16}{before_time * 1000:>11.2f}{full_time * 1000:>9.2f}{after_time * 1000:>10.2f}"
+              f"{before_time / full_time:>6.1f}x{full_time / after_time:>9.1f}x{before_time / after_time:>7.1f}x"
+              f"{before_peak / 1024:>12.0f}{after_peak / 1024:>11.0f}")
+
+if __name__ == '__main__':
+    main()
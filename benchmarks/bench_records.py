@@ -0,0 +1,59 @@
+import argparse
+import gc
+import time
+import tracemalloc
+
+from common import read_fixture
+
+from prices import normalize_rows
+from records import AmazonListing, BolListing, MarktplaatsListing
+from sites import get_adapter
+
+SITES = [
+    ('bol.com', 'bol', 'bol_search.html', BolListing),
+    ('marktplaats', 'marktplaats', 'marktplaats_search.html', MarktplaatsListing),
+    ('amazon.nl', 'amazon.nl', 'amazon_search.html', AmazonListing),
+]
+
+def template_rows(site, fixture):
+    # Field values of the listings on one saved results page
+    return [dict(listing.items()) for listing in get_adapter(site).parse_page(read_fixture(fixture))[0]]
+
+def build_rows(templates, count, record=None):
+    # `count` listings with their own string objects, like a long crawl would hold. Every
+    # value is copied so both representations pay for the same strings.
+    rows = []
+    for i in range(count):
+        values = {field: f'{value} {i}' for field, value in templates[i % len(templates)].items()}
+        rows.append(values if record is None else record(**values))
+    return rows
+
+def measure(templates, count, record=None):
+    # (bytes per listing after parsing, after price normalization, seconds)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = build_rows(templates, count, record)
+    parsed = tracemalloc.get_traced_memory()[0]
+    normalize_rows(rows, default_currency='EUR')
+    gc.collect()
+    normalized = tracemalloc.get_traced_memory()[0]
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    del rows
+    return parsed / count, normalized / count, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the memory of listings held as dicts and as slotted records.')
+    parser.add_argument('--rows', type=int, default=100000, help='Listings per site')
+    args = parser.parse_args()
+
+    print(f"{'Site':<14}{'Rows as':<10}{'parsed B/row':>14}{'normalized B/row':>18}{'seconds':>10}")
+    for name, site, fixture, record in SITES:
+        templates = template_rows(site, fixture)
+        for label, kind in (('dicts', None), ('records', record)):
+            parsed, normalized, elapsed = measure(templates, args.rows, kind)
+            print(f"{name:<14}{label:<10}{parsed:>14.0f}{normalized:>18.0f}{elapsed:>10.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import os
+import tempfile
+import time
+
+import common  # noqa: F401  (puts the repository root on sys.path)
+
+from docx import Document
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+from exporters import WordStreamWriter
+
+COLUMNS = [('name', 'Name'), ('price', 'Price'), ('link', 'Link'), ('image', 'Image URL')]
+
+def make_rows(count):
+    return [{
+        'name': f'AK-47 | Redline (Field-Tested) #{i}',
+        'price': f'${i % 500}.{i % 100:02d} USD',
+        'link': f'https://steamcommunity.com/market/listings/730/item%20{i}',
+        'image': f'https://community.cloudflare.steamstatic.com/economy/image/{i}/62fx62f',
+    } for i in range(count)]
+
+def legacy_export(rows, path):
+    # The old download_word: add_row().cells per row, then a w:shd element on every cell.
+    # It appended the shading to the paragraph, which raises; the cell is what was meant.
+    document = Document()
+    document.add_heading('Steam Market Top Items', 0).alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    table = document.add_table(rows=1, cols=4)
+    table.style = 'Table Grid'
+    hdr_cells = table.rows[0].cells
+    for cell, (_, header) in zip(hdr_cells, COLUMNS):
+        cell.text = header
+        cell.paragraphs[0].runs[0].bold = True
+    for item in rows:
+        row_cells = table.add_row().cells
+        row_cells[0].text = item['name']
+        row_cells[1].text = item['price']
+        row_cells[2].text = item['link']
+        row_cells[3].text = item['image']
+    for row in table.rows[1:]:
+        for cell in row.cells:
+            shading = OxmlElement('w:shd')
+            shading.set(qn('w:fill'), 'F3F3F3')
+            cell._tc.get_or_add_tcPr().append(shading)
+    document.save(path)
+
+def stream_export(rows, path):
+    with WordStreamWriter(path, COLUMNS, title='Steam Market Top Items') as writer:
+        writer.write(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the old Word export with the one-pass table writer.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000], help='Row counts to export')
+    args = parser.parse_args()
+
+    print(f"{'Rows':>7}  {'Export':<10}{'seconds':>9}{'file KiB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'export.docx')
+        for count in args.rows:
+            rows = make_rows(count)
+            timings = {}
+            for name, export in [('legacy', legacy_export), ('stream', stream_export)]:
+                start = time.perf_counter()
+                export(rows, path)
+                timings[name] = time.perf_counter() - start
+                print(f"{count:>7}  {name:<10}{timings[name]:>9.2f}{os.path.getsize(path) / 1024:>10.0f}")
+            print(f"{count:>7}  {'speedup':<10}{timings['legacy'] / timings['stream']:>8.1f}x")
+
+if __name__ == '__main__':
+    main()
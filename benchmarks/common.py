@@ -0,0 +1,21 @@
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+# The scrapers live in the repository root
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+def load_script(filename, name):
+    # Scripts like amazon.items.py can't be imported by name because of the dot
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def read_fixture(filename):
+    with open(os.path.join(FIXTURES, filename), 'rb') as f:
+        return f.read()
@@ -0,0 +1,318 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+
+CHROMEDRIVER_PATH = './chromedriver/chromedriver.exe'  # Update this with the actual path to your ChromeDriver
+
+# Lean profile: requests the scrapers never need, blocked in the browser itself. The
+# patterns are matched against the whole URL, so each extension is also listed with a
+# query string, for versioned assets like buttons.css?v=...
+LEAN_BLOCKED_EXTENSIONS = ['css', 'woff', 'woff2', 'ttf', 'otf', 'png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico']
+LEAN_BLOCKED_URLS = [pattern for extension in LEAN_BLOCKED_EXTENSIONS for pattern in (f'*.{extension}', f'*.{extension}?*')]
+LEAN_PREFS = {
+    'profile.managed_default_content_settings.images': 2,
+    'profile.managed_default_content_settings.plugins': 2,
+    'profile.managed_default_content_settings.notifications': 2,
+}
+
+def host_resolver_rules(allowed_hosts):
+    # Every other host fails to resolve, so trackers and ad scripts are never fetched
+    return 'MAP * ~NOTFOUND, ' + ', '.join(f'EXCLUDE {host}' for host in allowed_hosts)
+
+def make_chrome_driver(lean=False, allowed_hosts=None):
+    options = Options()
+    options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+
+    if lean:
+        # Only the DOM is read: skip images, stylesheets and fonts, and return from get()
+        # once the document is parsed instead of after every subresource has loaded
+        options.page_load_strategy = 'eager'
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_argument('--disable-extensions')
+        options.add_argument('--disable-background-networking')
+        options.add_experimental_option('prefs', LEAN_PREFS)
+        if allowed_hosts:
+            options.add_argument(f'--host-resolver-rules={host_resolver_rules(allowed_hosts)}')
+
+    service = Service(CHROMEDRIVER_PATH)
+    driver = webdriver.Chrome(service=service, options=options)
+    if lean:
+        # Chrome has no content setting for fonts and stylesheets, the URL block list covers them
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URLS})
+    return driver
+
+def process_rss(pid):
+    # Resident memory of a process and all its children in bytes, or None where /proc
+    # isn't available (e.g. on Windows)
+    try:
+        children = {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f'/proc/{entry}/stat') as f:
+                        parent = int(f.read().rsplit(')', 1)[1].split()[1])
+                except (OSError, IndexError, ValueError):
+                    continue
+                children.setdefault(parent, []).append(int(entry))
+
+        total = 0
+        pending = [pid]
+        while pending:
+            current = pending.pop()
+            pending.extend(children.get(current, []))
+            try:
+                with open(f'/proc/{current}/statm') as f:
+                    total += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+            except (OSError, IndexError, ValueError):
+                continue
+        return total
+    except OSError:
+        return None
+
+def browser_rss(driver):
+    # Memory of the chromedriver process and the Chrome processes it started
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    if process is None:
+        return None
+    return process_rss(process.pid)
+
+class FakeElement:
+    def __init__(self, html):
+        self.html = html
+
+    def get_attribute(self, name):
+        if name == 'outerHTML':
+            return self.html
+        return None
+
+class FakeDriver:
+    # Stand-in for webdriver.Chrome that serves canned HTML, so the pool and the
+    # scrapers can be exercised without launching a browser
+    def __init__(self, page_source='', crash_after=None):
+        self.page_source = page_source
+        self.crash_after = crash_after
+        self.urls = []
+        self.quit_called = False
+
+    def _check_alive(self):
+        if self.quit_called:
+            raise WebDriverException('Fake driver has been quit')
+        if self.crash_after is not None and len(self.urls) > self.crash_after:
+            raise WebDriverException('Fake driver crashed')
+
+    @property
+    def current_url(self):
+        self._check_alive()
+        return self.urls[-1] if self.urls else 'about:blank'
+
+    def get(self, url):
+        self.urls.append(url)
+        self._check_alive()
+
+    def find_element(self, by, value):
+        self._check_alive()
+        if f'id="{value}"' not in self.page_source:
+            raise NoSuchElementException(f'No element with {by} {value}')
+        return FakeElement(self.page_source)
+
+    def quit(self):
+        self.quit_called = True
+
+class DriverPool:
+    # Bounded pool of reusable browser instances. Drivers are handed out with
+    # checkout()/checkin() (or the driver() context manager) and are recycled
+    # after max_pages page loads (as reported through record_load()) or as soon
+    # as they crash.
+    def __init__(self, factory=make_chrome_driver, size=2, max_pages=50, checkout_timeout=60, warm=False):
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = queue.LifoQueue()  # LIFO keeps the most recently used driver hot
+        self._lock = threading.Lock()
+        self._created = 0
+        self._page_counts = {}
+        self._closed = False
+        self._warming = False
+
+        # Counters exposed through stats()
+        self.checkouts = 0
+        self.recycled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.loads = 0
+        self.total_load_time = 0.0
+        self.max_load_time = 0.0
+        self.last_rss = None
+        self.max_rss = None
+
+        if warm:
+            self.warm()
+
+    def warm(self):
+        # Start browsers up front so the first requests don't pay for Chrome startup
+        while True:
+            with self._lock:
+                if self._created >= self.size:
+                    return
+                self._created += 1
+            driver = self._create()
+            if self._closed:
+                self._discard(driver)
+                return
+            self._idle.put(driver)
+
+    def warm_async(self):
+        # warm() on a background thread, started once, for callers that shouldn't wait
+        # for Chrome to start
+        with self._lock:
+            if self._warming or self._closed:
+                return
+            self._warming = True
+        threading.Thread(target=self._warm_quietly, name='driver-pool-warm', daemon=True).start()
+
+    def _warm_quietly(self):
+        try:
+            self.warm()
+        except Exception as e:
+            print(f"Could not start a browser for the pool: {e}")
+
+    def _create(self):
+        try:
+            driver = self.factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+        with self._lock:
+            self._page_counts[driver] = 0
+        return driver
+
+    def _discard(self, driver):
+        with self._lock:
+            self._page_counts.pop(driver, None)
+            self._created -= 1
+            self.recycled += 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _is_healthy(self, driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def checkout(self, timeout=None):
+        if self._closed:
+            raise RuntimeError('Driver pool is closed')
+        if timeout is None:
+            timeout = self.checkout_timeout
+
+        start = time.monotonic()
+        driver = None
+        while driver is None:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    driver = self._create()
+                else:
+                    remaining = timeout - (time.monotonic() - start)
+                    try:
+                        driver = self._idle.get(timeout=max(remaining, 0))
+                    except queue.Empty:
+                        raise TimeoutError(f'No browser became available within {timeout} seconds')
+
+            # Replace drivers whose browser died while sitting in the pool
+            if not self._is_healthy(driver):
+                self._discard(driver)
+                driver = None
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return driver
+
+    def checkin(self, driver, broken=False):
+        with self._lock:
+            pages = self._page_counts.get(driver, 0)
+        if broken or self._closed or pages >= self.max_pages:
+            self._discard(driver)
+        else:
+            self._idle.put(driver)
+
+    def record_load(self, driver, seconds):
+        # Called by the scrapers after a page load, for the load time and browser memory in stats()
+        rss = browser_rss(driver)
+        with self._lock:
+            if driver in self._page_counts:
+                self._page_counts[driver] += 1
+            self.loads += 1
+            self.total_load_time += seconds
+            self.max_load_time = max(self.max_load_time, seconds)
+            if rss is not None:
+                self.last_rss = rss
+                self.max_rss = max(self.max_rss or 0, rss)
+        return rss
+
+    @contextmanager
+    def driver(self, timeout=None):
+        driver = self.checkout(timeout)
+        try:
+            yield driver
+        except WebDriverException:
+            self.checkin(driver, broken=True)
+            raise
+        except BaseException:
+            self.checkin(driver)
+            raise
+        else:
+            self.checkin(driver)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'created': self._created,
+                'idle': self._idle.qsize(),
+                'in_use': self._created - self._idle.qsize(),
+                'checkouts': self.checkouts,
+                'recycled': self.recycled,
+                'avg_wait': self.total_wait / self.checkouts if self.checkouts else 0.0,
+                'max_wait': self.max_wait,
+                'pages_per_driver': list(self._page_counts.values()),
+                'loads': self.loads,
+                'avg_load_time': self.total_load_time / self.loads if self.loads else 0.0,
+                'max_load_time': self.max_load_time,
+                'last_rss': self.last_rss,
+                'max_rss': self.max_rss,
+            }
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
@@ -0,0 +1,146 @@
+import os
+import argparse
+from datetime import datetime
+from itertools import chain
+
+import response_cache
+from async_pages import CrawlStatus
+from exporters import FORMAT_CHOICES, FORMAT_PROMPT, CsvStreamWriter, ExcelStreamWriter, NdjsonStreamWriter, ParquetStreamWriter, write_stream
+from listing_index import ListingIndex, default_stop_after, iter_changes
+from parse_pool import ParsePool
+from price_history import PriceHistory, record_stream
+from prices import normalize_stream
+from sites import ADAPTERS, get_adapter
+
+# One pipeline for every site: adapter pages -> (change detection) -> price normalization
+# -> price history -> file writers. The adapters in sites.py only describe the sites.
+
+def iter_listings(adapter, query=None, max_pages=None, concurrency=4, delay=1.0, pool=None):
+    # Yields listings as each page is parsed. Pages are requested concurrently, with at
+    # least `delay` seconds between requests to the same host
+    for listings in adapter.iter_pages(query, max_pages, concurrency, delay, pool):
+        yield from listings
+
+def query_slug(query):
+    return ''.join(c if c.isalnum() else '_' for c in query.lower())
+
+def index_path(adapter, query=None):
+    # Each search gets its own index, otherwise a different query would report every
+    # listing of the previous one as removed
+    name = adapter.name.replace('.', '_')
+    if query and query != adapter.default_query:
+        name += '_' + query_slug(query)
+    return f'{name}_index.sqlite'
+
+def iter_listing_changes(adapter, query=None, path=None, stop_after=None, max_pages=None, concurrency=2, delay=1.0, pool=None):
+    # Incremental crawl: yields only the listings that are new, changed or removed since
+    # the previous run. On sites sorted newest-first it stops paginating once it reaches
+    # listings it has already seen.
+    if stop_after is None:
+        stop_after = default_stop_after(adapter.newest_first)
+    elif stop_after and not adapter.newest_first:
+        print(f"Warning: {adapter.name} results are not sorted newest first, so --stop-after can stop before listings that changed.")
+    index = ListingIndex(path or index_path(adapter, query))
+    status = CrawlStatus()
+    try:
+        pages = adapter.iter_pages(query, max_pages, concurrency, delay, pool, status)
+        yield from iter_changes(pages, index, adapter.key_field, adapter.hash_fields, stop_after, status, adapter.newest_first)
+    finally:
+        index.close()
+
+def open_writers(adapter, choice, directory, timestamp, changes=False):
+    columns = adapter.output_columns(changes)
+    kind = 'changes' if changes else adapter.file_kind
+    base = os.path.join(directory, f'{adapter.file_prefix}_{kind}_{timestamp}')
+
+    writers = []
+    if choice in ('excel', 'both'):
+        sheet_name = 'Changes' if changes else adapter.sheet_name
+        writers.append(ExcelStreamWriter(base + '.xlsx', columns, sheet_name=sheet_name, widths=adapter.column_widths(changes), **adapter.excel_options))
+    if choice in ('csv', 'both'):
+        writers.append(CsvStreamWriter(base + '.csv', columns))
+    if choice == 'parquet':
+        writers.append(ParquetStreamWriter(base + '.parquet', columns))
+    if choice == 'ndjson':
+        writers.append(NdjsonStreamWriter(base + '.ndjson', columns))
+    return writers
+
+def run(adapter, choice, directory, query=None, max_pages=None, incremental=False, stop_after=None, index=None,
+        history=True, concurrency=None, delay=1.0, parse_workers=0):
+    # Scrapes one site into files of the chosen format and returns the number of rows saved
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    writers = []
+    price_history = PriceHistory() if history else None
+    # Parsing in worker processes pays off once pages arrive faster than one core parses them
+    pool = ParsePool(parse_workers) if parse_workers else None
+    try:
+        if incremental:
+            listings = iter_listing_changes(adapter, query, index, stop_after, max_pages, concurrency or 2, delay, pool)
+        else:
+            listings = iter_listings(adapter, query, max_pages, concurrency or 4, delay, pool)
+        listings = normalize_stream(listings, default_currency=adapter.currency)
+        if price_history:
+            listings = record_stream(listings, price_history, adapter.history_source or adapter.name, adapter.key_field, title_field=adapter.title_field)
+
+        # The files are only created once the first row arrives, so a crawl that finds
+        # nothing leaves no header-only files behind
+        first = next(listings, None)
+        if first is None:
+            return 0
+        os.makedirs(directory, exist_ok=True)
+        # Listings are written as each page arrives, so a failure late in the crawl keeps earlier pages
+        writers = open_writers(adapter, choice, directory, timestamp, changes=incremental)
+        return write_stream(chain([first], listings), writers)
+    finally:
+        for writer in writers:
+            writer.close()
+        if price_history:
+            price_history.close()
+        if pool:
+            pool.close()
+
+def add_arguments(parser):
+    parser.add_argument('--query', help='Search text (each site has a default)')
+    parser.add_argument('--format', choices=FORMAT_CHOICES, help='Output format (asked interactively if omitted)')
+    parser.add_argument('--incremental', action='store_true', help='Only save listings that are new, changed or removed since the last incremental run')
+    parser.add_argument('--stop-after', type=int,
+                        help='Stop after this many already-seen listings in a row (0 crawls every page). Only sites sorted newest first '
+                             'stop by default; on the others every page is crawled.')
+    parser.add_argument('--index', help='File with the listings seen by earlier incremental runs')
+    parser.add_argument('--max-pages', type=int, help='Maximum number of result pages to crawl')
+    parser.add_argument('--concurrency', type=int, help='Pages fetched in parallel (default 4, 2 for incremental runs)')
+    parser.add_argument('--delay', type=float, default=1.0, help='Minimum seconds between requests to the same host')
+    parser.add_argument('--parse-workers', type=int, default=0, help='Parse pages in this many worker processes (0 parses in the main process)')
+    parser.add_argument('--output-dir', help="Directory for the files (defaults to the site's own, e.g. Bol_Data)")
+    parser.add_argument('--no-history', action='store_true', help='Do not add the prices to the price history')
+    parser.add_argument('--cache', choices=response_cache.CACHE_MODES, help=response_cache.CACHE_HELP)
+
+def main(adapter, args):
+    response_cache.configure(mode=args.cache)
+
+    # Ask the user which format to save in
+    choice = args.format or input(FORMAT_PROMPT).strip().lower()
+
+    if choice not in FORMAT_CHOICES:
+        print("Invalid choice. Please run the script again and enter 'excel', 'csv', 'both', 'parquet' or 'ndjson'.")
+        return
+
+    directory = args.output_dir or adapter.directory
+    total = run(adapter, choice, directory, args.query, args.max_pages, args.incremental, args.stop_after, args.index,
+                not args.no_history, args.concurrency, args.delay, args.parse_workers)
+
+    if total:
+        print(f"Saved {total} listings to {directory}.")
+    elif args.incremental:
+        print("No new, changed or removed listings.")
+    else:
+        print("No data to save.")
+
+if __name__ == '__main__':
+    sites = '\n'.join(f'  {name:<12} {adapter.description}' for name, adapter in sorted(ADAPTERS.items()))
+    parser = argparse.ArgumentParser(description='Scrape any supported site to Excel, CSV, Parquet or NDJSON.',
+                                     epilog=f'sites:\n{sites}', formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('site', choices=sorted(ADAPTERS), metavar='site', help='Site to scrape, see the list below')
+    add_arguments(parser)
+    args = parser.parse_args()
+    main(get_adapter(args.site), args)
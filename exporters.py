@@ -0,0 +1,305 @@
+import csv
+import io
+import json
+from copy import deepcopy
+
+import xlsxwriter
+from docx import Document
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None  # Only needed for the Parquet export
+
+from records import Record
+
+# Columns stored as numbers in Parquet; everything else is a string column
+PARQUET_TYPES = {'amount': 'float64'}
+
+# Output formats the scraper scripts offer; 'both' means Excel and CSV
+FORMAT_CHOICES = ('excel', 'csv', 'both', 'parquet', 'ndjson')
+FORMAT_PROMPT = "Do you want to save the data as Excel, CSV, both, Parquet or NDJSON? Enter 'excel', 'csv', 'both', 'parquet' or 'ndjson': "
+
+HEADER_FORMAT = {
+    'bold': True,
+    'text_wrap': True,
+    'valign': 'top',
+    'fg_color': '#D7E4BC',
+    'border': 1,
+    'align': 'center'
+}
+
+# Grid table with a bold green header row and grey bands, the Word counterpart of the
+# Excel header format and banding. Defined once and referenced by the table instead of
+# shading every cell.
+BANDED_TABLE_STYLE = 'BandedGrid'
+BANDED_TABLE_STYLE_XML = (
+    f'<w:style {nsdecls("w")} w:type="table" w:customStyle="1" w:styleId="{BANDED_TABLE_STYLE}">'
+    '<w:name w:val="Banded Grid"/>'
+    '<w:basedOn w:val="TableGrid"/>'
+    '<w:tblPr><w:tblStyleRowBandSize w:val="1"/></w:tblPr>'
+    '<w:tblStylePr w:type="firstRow"><w:rPr><w:b/></w:rPr>'
+    '<w:tcPr><w:shd w:val="clear" w:color="auto" w:fill="D7E4BC"/></w:tcPr></w:tblStylePr>'
+    '<w:tblStylePr w:type="band1Horz"><w:tcPr><w:shd w:val="clear" w:color="auto" w:fill="F3F3F3"/></w:tcPr></w:tblStylePr>'
+    '</w:style>'
+)
+
+def row_values(row, fields):
+    # Slotted records hand out all their values in one call
+    if isinstance(row, Record):
+        return row.values(fields)
+    return [row.get(field) for field in fields]
+
+def write_stream(rows, writers, batch_size=50):
+    # Feeds rows from an iterator to every writer in small batches, so results reach
+    # disk while the scraper is still working on later pages
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            for writer in writers:
+                writer.write(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        for writer in writers:
+            writer.write(batch)
+        total += len(batch)
+    return total
+
+def iter_csv(rows, columns, batch_size=50):
+    # Yields CSV text in chunks of batch_size rows, for a chunked HTTP response that
+    # starts before the last row has been scraped
+    fields = [field for field, _ in columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for _, header in columns])
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row_values(row, fields))
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_ndjson(rows, columns=None, batch_size=50):
+    # Same as iter_csv() with one JSON object per line, keyed by field name
+    fields = [field for field, _ in columns] if columns else None
+    lines = []
+    for row in rows:
+        record = dict(zip(fields, row_values(row, fields))) if fields else row
+        lines.append(json.dumps(record, ensure_ascii=False))
+        if len(lines) >= batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+class CsvStreamWriter:
+    # Appends rows to a CSV file as they arrive, so a crawl that dies halfway
+    # still leaves the pages it finished on disk
+    def __init__(self, path, columns):
+        self.path = path
+        self.fields = [field for field, _ in columns]
+        self.rows = 0
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([header for _, header in columns])
+
+    def write(self, rows):
+        for row in rows:
+            self.writer.writerow(row_values(row, self.fields))
+            self.rows += 1
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class NdjsonStreamWriter:
+    # One JSON object per line, keyed by field name, appended as rows arrive
+    def __init__(self, path, columns):
+        self.path = path
+        self.fields = [field for field, _ in columns]
+        self.rows = 0
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        for row in rows:
+            record = dict(zip(self.fields, row_values(row, self.fields)))
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.rows += 1
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ParquetStreamWriter:
+    # Typed, zstd-compressed Parquet. Rows are buffered into row groups of
+    # row_group_size, so streaming small batches doesn't produce tiny row groups.
+    def __init__(self, path, columns, types=None, row_group_size=10000, compression='zstd'):
+        if pa is None:
+            raise ImportError("Parquet export needs pyarrow: pip install pyarrow")
+        self.path = path
+        self.fields = [field for field, _ in columns]
+        types = {**PARQUET_TYPES, **(types or {})}
+        self.schema = pa.schema([(field, pa.type_for_alias(types.get(field, 'string'))) for field in self.fields])
+        self.row_group_size = row_group_size
+        self.buffer = []
+        self.rows = 0
+        self.writer = pq.ParquetWriter(path, self.schema, compression=compression)
+
+    def write(self, rows):
+        for row in rows:
+            self.buffer.append(row)
+            self.rows += 1
+            if len(self.buffer) >= self.row_group_size:
+                self._flush()
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        values = [row_values(row, self.fields) for row in self.buffer]
+        data = {field: [row[i] for row in values] for i, field in enumerate(self.fields)}
+        self.writer.write_table(pa.Table.from_pydict(data, schema=self.schema))
+        self.buffer = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ExcelStreamWriter:
+    # Writes rows straight into an xlsx worksheet. With constant_memory only the
+    # current row is kept in memory, so the file size is bounded by disk, not RAM.
+    def __init__(self, path, columns, sheet_name='Sheet1', widths=None, banded=False, highlight=None, constant_memory=True):
+        self.path = path
+        self.fields = [field for field, _ in columns]
+        self.banded = banded
+        self.highlight = highlight
+        self.rows = 0
+
+        options = {'strings_to_urls': False}
+        if isinstance(path, str):
+            options['constant_memory'] = constant_memory
+        else:
+            options['in_memory'] = True
+        self.workbook = xlsxwriter.Workbook(path, options)
+        self.worksheet = self.workbook.add_worksheet(sheet_name)
+
+        for col_num, width in enumerate(widths or []):
+            self.worksheet.set_column(col_num, col_num, width)
+
+        header_format = self.workbook.add_format(HEADER_FORMAT)
+        self.worksheet.write_row(0, 0, [header for _, header in columns], header_format)
+
+    def write(self, rows):
+        for row in rows:
+            self.rows += 1
+            self.worksheet.write_row(self.rows, 0, row_values(row, self.fields))
+
+    def close(self):
+        last_col = len(self.fields) - 1
+
+        if self.rows and self.banded:
+            # Alternating row colours as one conditional format instead of a format per cell
+            band_format = self.workbook.add_format({'bg_color': '#F3F3F3'})
+            self.worksheet.conditional_format(1, 0, self.rows, last_col, {
+                'type': 'formula',
+                'criteria': '=MOD(ROW(),2)=0',
+                'format': band_format
+            })
+
+        if self.rows and self.highlight:
+            # highlight is (field, text): colour cells of that column containing the text
+            field, text = self.highlight
+            col_num = self.fields.index(field)
+            price_format = self.workbook.add_format({
+                'bg_color': '#FFEB9C',
+                'font_color': '#9C5700'
+            })
+            self.worksheet.conditional_format(1, col_num, self.rows, col_num, {'type': 'text', 'criteria': 'containing', 'value': text, 'format': price_format})
+
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class WordStreamWriter:
+    # Builds a Word table in one pass. Each row is a copy of a prepared <w:tr> with only
+    # its text filled in, instead of table.add_row().cells, which walks the whole table on
+    # every call. Banding comes from the table style, and the header row repeats on every
+    # page. Word documents are kept in memory until saved, so max_rows caps the table.
+    def __init__(self, path, columns, title=None, max_rows=None):
+        self.path = path
+        self.fields = [field for field, _ in columns]
+        self.max_rows = max_rows
+        self.rows = 0
+        self.truncated = False
+
+        self.document = Document()
+        self.document.styles.element.append(parse_xml(BANDED_TABLE_STYLE_XML))
+        if title:
+            self.document.add_heading(title, 0).alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+
+        table = self.document.add_table(rows=2, cols=len(columns))
+        table.style = self.document.styles.get_by_id(BANDED_TABLE_STYLE, 3)
+        # The default tblLook already enables the header row and row banding of the style
+        self.table = table._tbl
+
+        header, template = self.table.tr_lst
+        for cell, (_, title_text) in zip(table.rows[0].cells, columns):
+            cell.text = title_text
+        header.get_or_add_trPr().append(parse_xml(f'<w:tblHeader {nsdecls("w")}/>'))
+
+        # Every cell of the template row gets an empty run whose text is replaced per row
+        for tc in template.tc_lst:
+            tc.p_lst[0].append(parse_xml(f'<w:r {nsdecls("w")}><w:t xml:space="preserve"></w:t></w:r>'))
+        self.table.remove(template)
+        self.template = template
+
+    def write(self, rows):
+        for row in rows:
+            if self.max_rows is not None and self.rows >= self.max_rows:
+                self.truncated = True
+                return
+            tr = deepcopy(self.template)
+            for text, value in zip(tr.iter(qn('w:t')), row_values(row, self.fields)):
+                text.text = '' if value is None else str(value)
+            self.table.append(tr)
+            self.rows += 1
+
+    def close(self):
+        if self.truncated:
+            self.document.add_paragraph(f'Only the first {self.rows} rows are included.')
+        self.document.save(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,151 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import response_cache
+from rate_limit import backoff_delay, retry_after_seconds
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+}
+DEFAULT_TIMEOUT = (5, 30)  # Seconds to connect, seconds to wait for data
+POOL_SIZE = 10  # Keep-alive connections per host
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+MAX_BACKOFF = 60.0  # Never sleep longer than this between attempts, whatever Retry-After says
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_sessions = {}
+_stats = {}
+_lock = threading.Lock()
+
+def configure(pool_size=None, timeout=None, max_retries=None):
+    global POOL_SIZE, DEFAULT_TIMEOUT, MAX_RETRIES
+    with _lock:
+        if pool_size is not None:
+            POOL_SIZE = pool_size
+        if timeout is not None:
+            DEFAULT_TIMEOUT = timeout
+        if max_retries is not None:
+            MAX_RETRIES = max_retries
+        # Sessions are rebuilt with the new pool size on next use
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+def get_session(url):
+    # One keep-alive session per host, so repeated requests reuse the TCP/TLS connection
+    host = urlsplit(url).netloc
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[host] = session
+        return session
+
+def record(url, latency, status=None, retried=False):
+    host = urlsplit(url).netloc
+    with _lock:
+        stats = _stats.setdefault(host, {
+            'requests': 0,
+            'errors': 0,
+            'retries': 0,
+            'total_latency': 0.0,
+            'max_latency': 0.0,
+            'statuses': {},
+        })
+        stats['requests'] += 1
+        stats['total_latency'] += latency
+        stats['max_latency'] = max(stats['max_latency'], latency)
+        if retried:
+            stats['retries'] += 1
+        if status is None:
+            stats['errors'] += 1
+        else:
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+
+def host_stats():
+    with _lock:
+        return {
+            host: dict(stats, statuses=dict(stats['statuses']), avg_latency=stats['total_latency'] / stats['requests'])
+            for host, stats in _stats.items()
+        }
+
+def cached_response(page):
+    # Rebuild a requests.Response from a cached page, so callers can't tell the difference
+    response = requests.Response()
+    response.status_code = page.status
+    response._content = page.body
+    response.headers = CaseInsensitiveDict(page.headers)
+    response.url = page.url
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+def replay_miss(url):
+    # Like an only-if-cached request in a browser: nothing stored means 504
+    response = requests.Response()
+    response.status_code = 504
+    response.reason = 'Not in the response cache'
+    response._content = b''
+    response.url = url
+    response.from_cache = True
+    return response
+
+def fetch(url, headers=None, timeout=None, retries=None, **kwargs):
+    # GET through the pooled session for the URL's host. Connection errors, timeouts,
+    # 429 and 5xx responses are retried with jittered backoff; after the last attempt
+    # the final response is returned (or the last exception raised).
+    session = get_session(url)
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    retries = MAX_RETRIES if retries is None else retries
+
+    for attempt in range(retries + 1):
+        start = time.monotonic()
+        try:
+            response = session.get(url, headers=headers, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            record(url, time.monotonic() - start, retried=attempt > 0)
+            if attempt == retries:
+                raise
+            response = None
+        else:
+            record(url, time.monotonic() - start, response.status_code, retried=attempt > 0)
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+
+        delay = retry_after_seconds(response) or backoff_delay(attempt, base=BACKOFF_BASE, cap=MAX_BACKOFF)
+        time.sleep(min(delay, MAX_BACKOFF))
+
+def get(url, headers=None, timeout=None, retries=None, **kwargs):
+    # fetch() behind the on-disk response cache: stored pages are revalidated with
+    # If-None-Match/If-Modified-Since, and in replay mode the network is never used
+    cache = response_cache.get_cache()
+    if cache is None:
+        return fetch(url, headers, timeout, retries, **kwargs)
+
+    key = response_cache.normalize_url(url, kwargs.get('params'))
+    page = cache.lookup(key)
+    if cache.mode == 'replay':
+        return cached_response(page) if page is not None else replay_miss(url)
+    if page is not None and page.is_fresh(cache.max_age):
+        return cached_response(page)
+
+    if page is not None:
+        headers = {**page.conditional_headers(), **(headers or {})}
+    response = fetch(url, headers, timeout, retries, **kwargs)
+
+    if response.status_code == 304 and page is not None:
+        cache.mark_revalidated(page)
+        return cached_response(page)
+    if response.status_code == 200:
+        cache.store(key, response.url, response.status_code, response.headers, response.content)
+    return response
@@ -0,0 +1,105 @@
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+class Job:
+    def __init__(self, key, func):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.func = func
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._done = threading.Event()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        # The job's result once it finished; raises its error if it failed and
+        # TimeoutError if it is still running after `timeout` seconds
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Job {self.id} is still {self.status}")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'error': repr(self.error) if self.error is not None else None,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+class JobQueue:
+    # Runs scrape jobs on a pool of worker threads. Submitting a key that is already
+    # queued or running returns that job instead of a new one, so identical requests
+    # share one scrape. Finished jobs stay available for polling until `keep` newer
+    # jobs have finished after them.
+    def __init__(self, workers=2, keep=500):
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._pending = {}  # key -> queued or running job
+        self._jobs = OrderedDict()  # id -> job, oldest first
+        self._counts = dict.fromkeys(('submitted', 'coalesced', 'done', 'failed'), 0)
+
+    def submit(self, key, func):
+        with self._lock:
+            job = self._pending.get(key)
+            if job is not None:
+                self._counts['coalesced'] += 1
+                return job
+            job = Job(key, func)
+            self._pending[key] = job
+            self._jobs[job.id] = job
+            self._counts['submitted'] += 1
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            job.result = job.func()
+            job.status = 'done'
+        except Exception as e:
+            job.error = e
+            job.status = 'failed'
+        job.finished = time.time()
+
+        with self._lock:
+            self._pending.pop(job.key, None)
+            self._counts[job.status] += 1
+            self._prune()
+        job._done.set()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished is not None]
+        for job_id in itertools.islice(finished, max(0, len(finished) - self.keep)):
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            return {
+                **self._counts,
+                'queued': statuses.count('queued'),
+                'running': statuses.count('running'),
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+# Number of already-seen listings in a row after which a newest-first crawl stops
+STOP_AFTER = 20
+
+def default_stop_after(newest_first):
+    # Stopping at already-seen listings only makes sense when the results are sorted by
+    # date; in any other order the next page can still hold new or changed listings
+    return STOP_AFTER if newest_first else 0
+
+def content_hash(listing, fields):
+    # Changes to any of these fields make a listing count as changed
+    text = '\x1f'.join(str(listing.get(field, '')) for field in fields)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+class ListingIndex:
+    # SQLite table of every listing seen so far, keyed by its URL. Each listing keeps
+    # the run and position it was first seen at, which orders the index newest-first
+    # the same way the search results are.
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute('''CREATE TABLE IF NOT EXISTS listings (
+            key TEXT PRIMARY KEY,
+            hash TEXT,
+            run INTEGER,
+            position INTEGER,
+            last_seen REAL,
+            data TEXT
+        )''')
+        self._db.commit()
+
+    def next_run(self):
+        return self._db.execute('SELECT COALESCE(MAX(run), 0) + 1 FROM listings').fetchone()[0]
+
+    def lookup(self, key):
+        # (hash, run, position) of a known listing, or None
+        return self._db.execute('SELECT hash, run, position FROM listings WHERE key = ?', (key,)).fetchone()
+
+    def add(self, key, digest, run, position, listing):
+        self._db.execute('INSERT INTO listings VALUES (?, ?, ?, ?, ?, ?)',
+                         (key, digest, run, position, time.time(), json.dumps(dict(listing))))
+
+    def update(self, key, digest, listing):
+        self._db.execute('UPDATE listings SET hash = ?, last_seen = ?, data = ? WHERE key = ?',
+                         (digest, time.time(), json.dumps(dict(listing)), key))
+
+    def touch(self, key):
+        self._db.execute('UPDATE listings SET last_seen = ? WHERE key = ?', (time.time(), key))
+
+    def pop_missing(self, seen, boundary=None):
+        # Removes and returns the listings that were not seen this run. With a boundary
+        # (run, position) only listings at least as new as it are considered, because the
+        # crawl stopped before reaching the older ones.
+        if boundary is None:
+            rows = self._db.execute('SELECT key, data FROM listings').fetchall()
+        else:
+            run, position = boundary
+            rows = self._db.execute('SELECT key, data FROM listings WHERE run > ? OR (run = ? AND position <= ?)',
+                                    (run, run, position)).fetchall()
+        missing = [(key, data) for key, data in rows if key not in seen]
+        self._db.executemany('DELETE FROM listings WHERE key = ?', [(key,) for key, _ in missing])
+        return [json.loads(data) for _, data in missing]
+
+    def commit(self):
+        self._db.commit()
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+def iter_changes(pages, index, key_field, hash_fields, stop_after=STOP_AFTER, status=None, newest_first=True):
+    # Takes the pages of a newest-first crawl (lists of listings, dicts or records) and
+    # yields only the listings that are new or changed, with their 'change' field set.
+    # Once stop_after listings in a row are unchanged the crawl is abandoned, which also
+    # stops the fetching of further pages. Listings that disappeared from the part of the results
+    # that was crawled are yielded last as 'removed'. status is the crawl's
+    # async_pages.CrawlStatus; without one the pages are taken to be every page there is.
+    # Pages that aren't sorted newest-first (newest_first=False) only give removals when
+    # every page was crawled.
+    run = index.next_run()
+    position = 0
+    seen = set()
+    unchanged_run = 0
+    boundary = None  # Oldest known listing reached, as (run, position)
+    stopped = False
+
+    for listings in pages:
+        for listing in listings:
+            key = listing.get(key_field)
+            if not key or key == 'N/A' or key in seen:
+                continue
+            seen.add(key)
+            digest = content_hash(listing, hash_fields)
+            known = index.lookup(key)
+
+            if known is None:
+                index.add(key, digest, run, position, listing)
+                position += 1
+                unchanged_run = 0
+                listing['change'] = 'new'
+                yield listing
+                continue
+
+            old_digest, known_run, known_position = known
+            if boundary is None or (known_run, -known_position) < (boundary[0], -boundary[1]):
+                boundary = (known_run, known_position)
+            if old_digest != digest:
+                index.update(key, digest, listing)
+                unchanged_run = 0
+                listing['change'] = 'changed'
+                yield listing
+            else:
+                index.touch(key)
+                unchanged_run += 1
+        index.commit()
+
+        if stop_after and unchanged_run >= stop_after:
+            stopped = True
+            break
+
+    if hasattr(pages, 'close'):
+        pages.close()
+
+    # After a complete crawl every listing that wasn't seen is gone. When the crawl was cut
+    # short, by stop_after or max_pages, only the ones newer than the oldest known listing
+    # it reached can be judged. After a failed page nothing can: its listings weren't seen.
+    if status is not None and status.failed:
+        print(f"{status.failed} page(s) failed, removed listings are not checked this run.")
+        removed = []
+    elif stopped or (status is not None and not status.complete):
+        removed = index.pop_missing(seen, boundary) if newest_first and boundary is not None else []
+    else:
+        removed = index.pop_missing(seen) if seen else []
+    for listing in removed:
+        yield {'change': 'removed', **listing}
+    index.commit()
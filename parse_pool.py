@@ -0,0 +1,78 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from records import Record
+
+def pack_rows(rows):
+    # List of dicts -> (field names, list of tuples); much less to pickle between
+    # processes than repeating every key in every row. Records of one class are sent as
+    # (class, their slot values).
+    if rows and isinstance(rows[0], Record) and all(type(row) is type(rows[0]) for row in rows):
+        return type(rows[0]), [row.__getstate__() for row in rows]
+    fields = []
+    for row in rows:
+        for field in row:
+            if field not in fields:
+                fields.append(field)
+    return tuple(fields), [tuple(row.get(field) for field in fields) for row in rows]
+
+def unpack_rows(fields, rows):
+    if isinstance(fields, type):
+        records = []
+        for state in rows:
+            record = fields.__new__(fields)
+            record.__setstate__(state)
+            records.append(record)
+        return records
+    return [dict(zip(fields, row)) for row in rows]
+
+def parse_packed(parse_page, body):
+    # Runs in a worker process: parse_page must be picklable, i.e. a module-level
+    # function or a functools.partial of one
+    items, last_page, next_url = parse_page(body)
+    return pack_rows(items), last_page, next_url
+
+class ParsePool:
+    # Parses fetched pages in worker processes, so parsing uses every core while the
+    # event loop keeps fetching. At most max_pending pages are queued or being parsed;
+    # further fetched pages wait for a slot, which holds back the crawl and keeps the
+    # raw pages in memory bounded.
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._loop = None
+        self._slots = None
+
+        # Counters exposed through stats()
+        self.pages = 0
+        self.bytes = 0
+
+    def _semaphore(self):
+        # asyncio semaphores belong to one event loop, and iter_crawl() makes a new loop per crawl
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_pending)
+        return self._slots
+
+    async def parse(self, parse_page, body):
+        # Same result as parse_page(body), computed in a worker process
+        async with self._semaphore():
+            (fields, rows), last_page, next_url = await asyncio.get_running_loop().run_in_executor(self._executor, parse_packed, parse_page, body)
+        self.pages += 1
+        self.bytes += len(body)
+        return unpack_rows(fields, rows), last_page, next_url
+
+    def stats(self):
+        return {'workers': self.workers, 'max_pending': self.max_pending, 'pages': self.pages, 'bytes': self.bytes}
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,20 @@
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+PARSER = 'lxml'
+
+def class_strainer(*patterns):
+    # Keeps only tags (and their contents) with a class matching one of the patterns.
+    # While parsing the strainer sees the raw class attribute, e.g. "hz-Listing hz-Listing--list-item",
+    # so each pattern is matched as a whole word inside it.
+    regex = re.compile(r'(^|\s)(' + '|'.join(patterns) + r')(\s|$)')
+    return SoupStrainer(attrs={'class': regex})
+
+def id_strainer(*ids):
+    return SoupStrainer(id=list(ids))
+
+def parse_html(markup, only=None):
+    # lxml is several times faster than html.parser, and parse_only skips building
+    # the parts of the page we never look at
+    return BeautifulSoup(markup, PARSER, parse_only=only)
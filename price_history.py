@@ -0,0 +1,155 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+from prices import PRICE_FIELDS
+
+# Every scraper run appends the prices it saw here, so price movements can be looked up
+# without opening the exported files one by one
+HISTORY_PATH = os.environ.get('SCRAPER_HISTORY', 'price_history.sqlite')
+BATCH_SIZE = 500
+
+class PriceHistory:
+    # Append-only SQLite history. Every item gets one row in `items`, which also holds its
+    # most recent price so snapshots never scan the history, and `prices` stores the
+    # series clustered by (item_id, ts), so one item's series is a single range scan.
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        # batch.py records from worker threads; the lock keeps their writes apart
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                item TEXT NOT NULL,
+                title TEXT,
+                ts REAL,
+                price TEXT,
+                amount REAL,
+                currency TEXT,
+                UNIQUE (source, item)
+            );
+            CREATE TABLE IF NOT EXISTS prices (
+                item_id INTEGER NOT NULL,
+                ts REAL NOT NULL,
+                price TEXT,
+                amount REAL,
+                currency TEXT,
+                PRIMARY KEY (item_id, ts)
+            ) WITHOUT ROWID;
+        ''')
+        self._add_missing_columns()
+        self._db.commit()
+
+    def _add_missing_columns(self):
+        # Histories created before prices were normalized lack the numeric columns
+        for table in ('items', 'prices'):
+            existing = {row[1] for row in self._db.execute(f'PRAGMA table_info({table})')}
+            for name, kind in (('amount', 'REAL'), ('currency', 'TEXT')):
+                if name not in existing:
+                    self._db.execute(f'ALTER TABLE {table} ADD COLUMN {name} {kind}')
+
+    def record(self, source, rows, key_field, price_field='price', title_field='title', ts=None, fields=PRICE_FIELDS):
+        # Appends one price per row and returns how many were stored. Rows without a key
+        # are skipped; the amount and currency come from the prices.normalize_* columns.
+        ts = time.time() if ts is None else ts
+        amount_field, currency_field, _ = fields
+        values = [(source, row[key_field], row.get(title_field), ts, row.get(price_field), row.get(amount_field), row.get(currency_field))
+                  for row in rows if row.get(key_field) and row.get(key_field) != 'N/A']
+        if not values:
+            return 0
+        with self._lock, self._db:
+            self._db.executemany('''INSERT INTO items (source, item, title, ts, price, amount, currency) VALUES (?, ?, ?, ?, ?, ?, ?)
+                                    ON CONFLICT (source, item) DO UPDATE SET title = excluded.title, ts = excluded.ts, price = excluded.price,
+                                        amount = excluded.amount, currency = excluded.currency
+                                    WHERE excluded.ts >= items.ts''', values)
+            self._db.executemany('INSERT OR REPLACE INTO prices SELECT id, ?, ?, ?, ? FROM items WHERE source = ? AND item = ?',
+                                 [(ts, price, amount, currency, source, item) for source, item, _, ts, price, amount, currency in values])
+        return len(values)
+
+    def series(self, source, item, since=None, until=None):
+        # [(timestamp, price, amount), ...] of one item, oldest first
+        query = '''SELECT prices.ts, prices.price, prices.amount FROM prices JOIN items ON items.id = prices.item_id
+                   WHERE items.source = ? AND items.item = ? AND prices.ts >= ? AND prices.ts <= ? ORDER BY prices.ts'''
+        return self._db.execute(query, (source, item, since or 0, until or float('inf'))).fetchall()
+
+    def latest(self, source, items=None):
+        # {item: (timestamp, price, title)} with the most recent price of each item
+        if items is None:
+            rows = self._db.execute('SELECT item, ts, price, title FROM items WHERE source = ?', (source,))
+            return {item: (ts, price, title) for item, ts, price, title in rows}
+        snapshot = {}
+        for item in items:
+            row = self._db.execute('SELECT ts, price, title FROM items WHERE source = ? AND item = ?', (source, item)).fetchone()
+            if row is not None:
+                snapshot[item] = row
+        return snapshot
+
+    def find(self, source, text, limit=20):
+        # Items whose title contains the text, to look up the key for series()
+        query = 'SELECT item, title FROM items WHERE source = ? AND title LIKE ? LIMIT ?'
+        return self._db.execute(query, (source, f'%{text}%', limit)).fetchall()
+
+    def close(self):
+        self._db.close()
+
+def record_stream(rows, history, source, key_field, price_field='price', title_field='title', fields=PRICE_FIELDS, batch_size=BATCH_SIZE):
+    # Passes the rows through unchanged while appending their prices to the history in
+    # batches, so it can sit between a scraper and its file writers. Rows an incremental
+    # crawl reports as removed carry an old price and are not recorded.
+    ts = time.time()
+    batch = []
+    for row in rows:
+        if row.get('change') != 'removed':
+            batch.append(row)
+        if len(batch) >= batch_size:
+            history.record(source, batch, key_field, price_field, title_field, ts, fields)
+            batch = []
+        yield row
+    history.record(source, batch, key_field, price_field, title_field, ts, fields)
+
+def format_time(ts):
+    return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Look up prices recorded by the scrapers.')
+    parser.add_argument('--path', default=HISTORY_PATH, help='History database')
+    commands = parser.add_subparsers(dest='command', required=True)
+    series_parser = commands.add_parser('series', help='Price series of one item')
+    series_parser.add_argument('source', help="'steam', 'bol', 'marktplaats' or 'amazon'")
+    series_parser.add_argument('item', help='Item key: the name for Steam, the URL for bol.com and Marktplaats, the ASIN for Amazon')
+    series_parser.add_argument('--days', type=float, help='Only the last N days')
+    latest_parser = commands.add_parser('latest', help='Most recent price of every item of a source')
+    latest_parser.add_argument('source')
+    find_parser = commands.add_parser('find', help='Search item keys by title')
+    find_parser.add_argument('source')
+    find_parser.add_argument('text')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"No price history at {args.path}.")
+        sys.exit(1)
+
+    history = PriceHistory(args.path)
+    try:
+        if args.command == 'series':
+            since = time.time() - args.days * 86400 if args.days else None
+            for ts, price, amount in history.series(args.source, args.item, since):
+                print(f"{format_time(ts)}  {price or 'N/A':<15}  {'' if amount is None else f'{amount:.2f}'}")
+        elif args.command == 'latest':
+            for item, (ts, price, title) in sorted(history.latest(args.source).items()):
+                print(f"{format_time(ts)}  {price or 'N/A':<15}  {title or item}")
+        else:
+            for item, title in history.find(args.source, args.text):
+                print(f"{item}  {title}")
+    except BrokenPipeError:
+        pass  # Output piped into e.g. head
+    finally:
+        history.close()
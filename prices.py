@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+# Numeric columns added next to the raw price text
+PRICE_FIELDS = ('amount', 'currency', 'price_type')
+PRICE_COLUMNS = [('amount', 'Amount'), ('currency', 'Currency'), ('price_type', 'Price Type')]
+PRICE_COLUMN_WIDTHS = [12, 10, 16]
+
+BATCH_SIZE = 1000
+
+CURRENCIES = {'€': 'EUR', '$': 'USD', '£': 'GBP', 'EUR': 'EUR', 'USD': 'USD', 'GBP': 'GBP'}
+CURRENCY_PATTERN = r'(€|\$|£|EUR|USD|GBP)'
+
+# Prices without a number on Marktplaats (and their English counterparts), checked in order
+PRICE_TYPES = [
+    ('bid', r'\bbieden\b|\bbod\b|\bbid\b'),
+    ('negotiable', r'n\.?o\.?t\.?k|overeenkomst|negotiable'),
+    ('free', r'gratis|\bfree\b'),
+    ('swap', r'ruilen|\bswap'),
+    ('see_description', r'zie omschrijving|see description'),
+]
+
+def parse_amounts(text):
+    # Series of price strings -> float64 array. The last '.' or ',' followed by one or
+    # two digits is the decimal separator, every other separator groups thousands, so
+    # "€ 1.299,00", "$1,299.00", "1299,-" and "$1.23 USD" all parse. Only regex
+    # replaces are used, which run natively on Arrow-backed strings.
+    number = (text.str.replace('\xa0', ' ', regex=False)
+                  .str.replace(r'^[^\d]*(\d[\d., ]*).*$', r'\1', regex=True)
+                  .str.replace(r'[ .,]+$', '', regex=True)
+                  .str.replace(r'[.,](\d{1,2})$', r'#\1', regex=True)
+                  .str.replace(r'[., ]', '', regex=True)
+                  .str.replace('#', '.', regex=False))
+    return pd.to_numeric(number, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+def parse_prices(text):
+    # (amount, currency, price type) arrays for a Series of distinct price strings
+    amount = parse_amounts(text)
+    symbol = text.str.replace(r'^.*?' + CURRENCY_PATTERN + '.*$', r'\1', regex=True)
+    currency = symbol.map(CURRENCIES).to_numpy(dtype=object, na_value=None)
+
+    lowered = text.str.lower()
+    conditions = [lowered.str.contains(pattern, regex=True).to_numpy(dtype=bool, na_value=False) for _, pattern in PRICE_TYPES]
+    choices = [price_type for price_type, _ in PRICE_TYPES]
+    price_type = np.select([conditions[0], ~np.isnan(amount)] + conditions[1:],
+                           [choices[0], 'fixed'] + choices[1:], default='unknown')
+    return amount, currency, price_type
+
+def normalize_prices(frame, column='price', default_currency=None, fields=PRICE_FIELDS):
+    # Adds amount, ISO currency and price type columns to a DataFrame of scraped rows.
+    # Scraped prices repeat a lot ("Bieden", "€ 50,00"), so each distinct string is
+    # parsed once with whole-column string operations and the results are spread back
+    # over the rows with a NumPy take.
+    amount_field, currency_field, type_field = fields
+    if column in frame:
+        codes, uniques = pd.factorize(frame[column].astype(object).fillna(''))
+    else:
+        codes, uniques = np.zeros(len(frame), dtype=np.intp), np.array([''], dtype=object)
+    amount, currency, price_type = parse_prices(pd.Series(uniques, dtype='string'))
+
+    amount = amount.take(codes)
+    currency = pd.Series(currency.take(codes), index=frame.index)
+    if default_currency:
+        currency = currency.fillna(default_currency)
+    currency = currency.where(~np.isnan(amount))
+    return frame.assign(**{amount_field: amount, currency_field: currency, type_field: price_type.take(codes)})
+
+def normalize_rows(rows, column='price', default_currency=None, fields=PRICE_FIELDS):
+    # Same as normalize_prices() for a list of row dicts, which get the new fields added
+    # in place; missing values become None so the writers leave those cells empty
+    if not rows:
+        return rows
+    frame = normalize_prices(pd.DataFrame({column: [row.get(column) for row in rows]}), column, default_currency, fields)
+    values = frame[list(fields)].astype(object)
+    values = values.where(values.notna(), None)
+    for row, normalized in zip(rows, values.itertuples(index=False, name=None)):
+        row.update(zip(fields, normalized))
+    return rows
+
+def normalize_stream(rows, column='price', default_currency=None, fields=PRICE_FIELDS, batch_size=BATCH_SIZE):
+    # Normalizes a stream of rows in batches, so the vectorized parsing still applies
+    # while rows keep flowing to the writers
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield from normalize_rows(batch, column, default_currency, fields)
+            batch = []
+    yield from normalize_rows(batch, column, default_currency, fields)
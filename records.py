@@ -0,0 +1,131 @@
+from operator import attrgetter
+
+# Filled in by the pipeline after parsing: the prices.PRICE_FIELDS columns and the
+# incremental change. Spelled out so the exporters can use records without pandas.
+PIPELINE_FIELDS = ('amount', 'currency', 'price_type', 'change')
+
+def make_getter(cls, fields):
+    if not cls._field_set.issuperset(fields):
+        # Some of the fields can only be in `extra`
+        return lambda record: tuple(record.get(field) for field in fields)
+    getter = attrgetter(*fields)
+    if len(fields) == 1:
+        return lambda record: (getter(record),)
+    return getter
+
+class Record:
+    # Base for the slotted listing records. A record stores its values in slots instead
+    # of a per-row dict, and behaves enough like a dict (get, [], keys, update, iteration)
+    # that the price normalization, change detection, history and writers handle it like
+    # the dicts it replaces. Fields that are never set read as None, like a missing key.
+    __slots__ = ()
+    fields = ()  # Slot names in column order, set for every subclass
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.fields = tuple(field for field in cls.__slots__ if field != 'extra')
+        cls._field_set = frozenset(cls.fields)
+        cls._getters = {}
+
+    def __init__(self, **values):
+        for field in self.fields:
+            setattr(self, field, values.pop(field, None))
+        if 'extra' in self.__slots__:
+            self.extra = None
+        for key, value in values.items():
+            self[key] = value
+
+    @classmethod
+    def from_values(cls, values):
+        # Inverse of values(), e.g. for rows packed into tuples by a parse worker
+        record = cls.__new__(cls)
+        for field, value in zip(cls.fields, values):
+            setattr(record, field, value)
+        if 'extra' in cls.__slots__:
+            record.extra = None
+        return record
+
+    def values(self, fields=None):
+        # Tuple of the values in column order. The getter for each list of fields is built
+        # once per class, so exporting a row is a single attrgetter call.
+        fields = self.fields if fields is None else tuple(fields)
+        getter = self._getters.get(fields)
+        if getter is None:
+            getter = self._getters[fields] = make_getter(type(self), fields)
+        return getter(self)
+
+    def get(self, key, default=None):
+        if key in self._field_set:
+            value = getattr(self, key)
+            return default if value is None else value
+        extra = getattr(self, 'extra', None)
+        if extra:
+            return extra.get(key, default)
+        return default
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            return getattr(self, key)
+        extra = getattr(self, 'extra', None)
+        if extra and key in extra:
+            return extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._field_set:
+            setattr(self, key, value)
+        elif 'extra' in self.__slots__:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+        else:
+            raise KeyError(f"{type(self).__name__} has no field '{key}'")
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def keys(self):
+        keys = [field for field in self.fields if getattr(self, field) is not None]
+        extra = getattr(self, 'extra', None)
+        return keys + list(extra) if extra else keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def update(self, values):
+        for key, value in (values.items() if hasattr(values, 'items') else values):
+            self[key] = value
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{key}={value!r}' for key, value in self.items())})"
+
+    def __getstate__(self):
+        return self.values(), getattr(self, 'extra', None)
+
+    def __setstate__(self, state):
+        values, extra = state
+        for field, value in zip(self.fields, values):
+            setattr(self, field, value)
+        if 'extra' in self.__slots__:
+            self.extra = extra
+
+class BolListing(Record):
+    __slots__ = ('title', 'price', 'url') + PIPELINE_FIELDS
+
+class MarktplaatsListing(Record):
+    __slots__ = ('title', 'price', 'seller', 'location', 'url') + PIPELINE_FIELDS
+
+class AmazonListing(Record):
+    # The specification tables differ per product, so those go into `extra`
+    __slots__ = ('asin', 'title', 'price', 'rating', 'reviews', 'shipping', 'url') + PIPELINE_FIELDS + ('extra',)
+
+class SteamItem(Record):
+    __slots__ = ('name', 'price', 'link', 'image') + PIPELINE_FIELDS
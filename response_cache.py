@@ -0,0 +1,185 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 'on' revalidates cached pages with conditional GETs, 'replay' never touches the
+# network (misses become 504 responses) and 'off' disables the cache. Off unless asked
+# for: few of the scraped pages send validators, so most runs would only fill the disk.
+CACHE_MODES = ('on', 'replay', 'off')
+CACHE_MODE = os.environ.get('SCRAPER_CACHE', 'off')
+CACHE_HELP = 'On-disk HTTP cache: on revalidates stored pages, replay only reads them (default: $SCRAPER_CACHE or off)'
+CACHE_PATH = os.environ.get('SCRAPER_CACHE_PATH', '.http_cache.sqlite')
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+CACHE_MAX_AGE = 0  # Seconds a cached page is used without asking the server
+ACCESS_FLUSH = 100  # Cache hits whose access times are written in one transaction
+
+# Headers that describe the transfer rather than the stored (already decoded) body
+SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie'}
+
+def normalize_url(url, params=None):
+    # Same page, same key: lowercase scheme/host, sorted query string, no fragment
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((key, str(value)) for key, value in params.items())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', urlencode(sorted(query)), ''))
+
+class CachedPage:
+    def __init__(self, key, url, status, headers, body, stored_at):
+        self.key = key
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.stored_at = stored_at
+
+    def conditional_headers(self):
+        headers = {}
+        if self.headers.get('etag'):
+            headers['If-None-Match'] = self.headers['etag']
+        if self.headers.get('last-modified'):
+            headers['If-Modified-Since'] = self.headers['last-modified']
+        return headers
+
+    def is_fresh(self, max_age):
+        return max_age > 0 and time.time() - self.stored_at < max_age
+
+class ResponseCache:
+    # SQLite-backed store of zlib-compressed response bodies, evicting the least
+    # recently used pages once the stored bodies exceed max_bytes
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES, mode=CACHE_MODE, max_age=CACHE_MAX_AGE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('''CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            url TEXT,
+            status INTEGER,
+            headers TEXT,
+            body BLOB,
+            size INTEGER,
+            stored_at REAL,
+            last_access REAL
+        )''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+        self._db.commit()
+        self._bytes = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        # Access times of cache hits that aren't written yet. Reads don't commit; the times
+        # go out with the next store, every ACCESS_FLUSH hits and on close.
+        self._accessed = {}
+
+        # Counters exposed through stats()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def lookup(self, key):
+        with self._lock:
+            row = self._db.execute('SELECT url, status, headers, body, stored_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._accessed[key] = time.time()
+            if len(self._accessed) >= ACCESS_FLUSH:
+                self._flush_access()
+                self._db.commit()
+            self.hits += 1
+        url, status, headers, body, stored_at = row
+        return CachedPage(key, url, status, json.loads(headers), zlib.decompress(body), stored_at)
+
+    def store(self, key, url, status, headers, body):
+        headers = {name.lower(): value for name, value in headers.items() if name.lower() not in SKIPPED_HEADERS}
+        compressed = zlib.compress(body, 6)
+        now = time.time()
+        with self._lock:
+            self._flush_access()  # Before the insert, which sets a newer access time, and the eviction
+            old = self._db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            if old is not None:
+                self._bytes -= old[0]
+            self._db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                             (key, url, status, json.dumps(headers), compressed, len(compressed), now, now))
+            self._bytes += len(compressed)
+            self._evict()
+            self._db.commit()
+        return CachedPage(key, url, status, headers, body, now)
+
+    def mark_revalidated(self, page):
+        # The server answered 304 Not Modified, so the stored copy counts as new again
+        now = time.time()
+        with self._lock:
+            self._accessed.pop(page.key, None)
+            self._db.execute('UPDATE responses SET stored_at = ?, last_access = ? WHERE key = ?', (now, now, page.key))
+            self._db.commit()
+            self.revalidated += 1
+        page.stored_at = now
+
+    def _flush_access(self):
+        if self._accessed:
+            self._db.executemany('UPDATE responses SET last_access = ? WHERE key = ?',
+                                 [(accessed, key) for key, accessed in self._accessed.items()])
+            self._accessed.clear()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes:
+            rows = self._db.execute('SELECT key, size FROM responses ORDER BY last_access LIMIT 50').fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._bytes -= size
+                if self._bytes <= self.max_bytes:
+                    break
+
+    def stats(self):
+        with self._lock:
+            count = self._db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            return {
+                'mode': self.mode,
+                'entries': count,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidated': self.revalidated,
+            }
+
+    def close(self):
+        with self._lock:
+            self._flush_access()
+            self._db.commit()
+            self._db.close()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def configure(mode=None, path=None, max_bytes=None, max_age=None):
+    global CACHE_MODE, CACHE_PATH, CACHE_MAX_BYTES, CACHE_MAX_AGE, _cache
+    with _cache_lock:
+        if mode is not None:
+            CACHE_MODE = mode
+        if path is not None:
+            CACHE_PATH = path
+        if max_bytes is not None:
+            CACHE_MAX_BYTES = max_bytes
+        if max_age is not None:
+            CACHE_MAX_AGE = max_age
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+
+def get_cache():
+    # The shared cache, or None when caching is switched off
+    global _cache
+    if CACHE_MODE == 'off':
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(CACHE_PATH, CACHE_MAX_BYTES, CACHE_MODE, CACHE_MAX_AGE)
+        return _cache
@@ -0,0 +1,147 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+def steam_key(appid, page, sort='popular_desc', query=''):
+    return ('steam', str(appid), int(page), sort, query)
+
+def estimate_size(value):
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class ResultCache:
+    # In-memory cache for scrape results with a TTL per entry and LRU eviction
+    # once the cached results exceed max_bytes. get_or_compute() deduplicates
+    # concurrent calls for the same key, so only one scrape runs per key at a time.
+    # Empty results are kept for empty_ttl seconds: long enough that a page past the end
+    # isn't scraped again on every request, short enough that a failed scrape recovers.
+    def __init__(self, ttl=300, max_bytes=32 * 1024 * 1024, empty_ttl=30, sizeof=estimate_size):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.empty_ttl = empty_ttl
+        self.sizeof = sizeof
+
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        # Counters exposed through stats()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self._bytes -= size
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, ttl=None):
+        # None means there was nothing to cache, e.g. the page could not be fetched
+        if value is None:
+            return
+        if ttl is None:
+            ttl = self.ttl if value else self.empty_ttl
+        size = self.sizeof(value)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+
+            # Drop the least recently used entries until we fit again
+            while self._bytes > self.max_bytes:
+                _, (_, old_size, _) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute, ttl=None):
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[2]
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self.misses += 1
+            else:
+                self.shared += 1
+
+        # Another request is already scraping this key, wait for its result
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            self.put(key, flight.value, ttl)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+        return flight.value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry[1]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'shared': self.shared,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
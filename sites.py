@@ -0,0 +1,300 @@
+import json
+import math
+from functools import partial
+from urllib.parse import quote_plus, urlencode, urljoin
+
+from bs4 import SoupStrainer
+
+import steam_crawler
+import steam_market
+from async_pages import iter_crawl, max_page_number
+from parsing import class_strainer, parse_html
+from prices import PRICE_COLUMN_WIDTHS, PRICE_COLUMNS
+from records import AmazonListing, BolListing, MarktplaatsListing, SteamItem
+
+# Field extractors: each returns a function that reads one field from a listing element
+
+def text(name, class_=None, separator='', prefix=''):
+    def extract(listing):
+        element = listing.find(name, class_=class_) if class_ else listing.find(name)
+        if element is None:
+            return 'N/A'
+        return prefix + element.get_text(separator, strip=True)
+    return extract
+
+def link(name, class_=None, base=None):
+    def extract(listing):
+        element = listing.find(name, class_=class_) if class_ else listing.find(name)
+        if element is None or not element.get('href'):
+            return 'N/A'
+        return urljoin(base, element['href'])
+    return extract
+
+def attribute(name):
+    # An attribute of the listing element itself
+    def extract(listing):
+        return listing.get(name, 'N/A')
+    return extract
+
+class SiteAdapter:
+    # Everything that differs between sites: how to build a search URL, which elements
+    # are listings, how to read their fields and how to find the next page. The engine
+    # does the fetching (concurrent, rate limited and cached), change detection, price
+    # normalization, history and export the same way for every adapter.
+    name = None
+    description = None
+    search_url = None  # First results page, with a {query} placeholder
+    page_suffix = None  # Appended to search_url for later pages, with a {page} placeholder
+    default_query = None
+
+    strainer = None  # Only these parts of a results page are parsed
+    listing = None  # (tag, attrs) of one search result
+    fields = {}  # field -> extractor(listing element)
+    record = None  # records.Record subclass the listings are built as, plain dicts when None
+    next_link = None  # (tag, attrs) of the link to the next results page
+    page_pattern = None  # Regex with the page number in the pagination links
+    base_url = None
+
+    columns = []
+    widths = []
+    key_field = 'url'  # Identifies a listing for change detection and the price history
+    title_field = 'title'
+    hash_fields = ('title', 'price')  # A listing counts as changed when one of these differs
+    # Whether search_url lists the newest results first. Only then can an incremental run
+    # stop at already-seen listings and judge removals from part of the results; none of
+    # the sites below sort by date (bol.com by relevance, Marktplaats by its own default
+    # order, Steam by popularity), so their incremental runs crawl every page.
+    newest_first = False
+    currency = None  # Currency of prices without a symbol
+    history_source = None  # Source name in the price history, defaults to the adapter name
+
+    directory = None
+    file_prefix = None
+    file_kind = 'listings'
+    sheet_name = 'Listings'
+    excel_options = {}
+
+    def first_url(self, query=None):
+        return self.search_url.format(query=quote_plus(query or self.default_query))
+
+    def page_url(self, query, page):
+        return self.first_url(query) + self.page_suffix.format(page=page)
+
+    def page_urls(self, query=None):
+        # Function of the page number, or None when later pages can only be reached
+        # through the next links
+        if not self.page_suffix:
+            return None
+        query = query or self.default_query
+        return lambda page: self.page_url(query, page)
+
+    def parse_listing(self, element):
+        values = {field: extract(element) for field, extract in self.fields.items()}
+        return values if self.record is None else self.record(**values)
+
+    def parse_listings(self, soup):
+        name, attrs = self.listing
+        return [self.parse_listing(element) for element in soup.find_all(name, attrs=attrs)]
+
+    def parse_page(self, html):
+        # (listings, last page number or None, next page URL or None), as iter_crawl() expects
+        soup = parse_html(html, self.strainer)
+        next_url = None
+        if self.next_link:
+            name, attrs = self.next_link
+            next_page = soup.find(name, attrs=attrs)
+            next_url = urljoin(self.base_url, next_page['href']) if next_page and next_page.get('href') else None
+        last_page = max_page_number(soup, self.page_pattern) if self.page_pattern else None
+        return self.parse_listings(soup), last_page, next_url
+
+    def page_parser(self, pool=None):
+        # parse_page, or with a parse pool a picklable stand-in that looks this adapter
+        # up by name in the worker process
+        return self.parse_page if pool is None else partial(parse_site_page, self.name)
+
+    def iter_pages(self, query=None, max_pages=None, concurrency=4, delay=1.0, pool=None, status=None):
+        # Yields the listings of each results page as soon as it is parsed. A CrawlStatus
+        # passed as status tells afterwards whether every page was crawled.
+        return iter_crawl(self.first_url(query), self.page_parser(pool), page_url=self.page_urls(query), max_pages=max_pages,
+                          concurrency=concurrency, delay=delay, pool=pool, status=status)
+
+    def column_widths(self, changes=False):
+        return [10] + self.widths if changes else self.widths
+
+    def output_columns(self, changes=False):
+        return [('change', 'Change')] + self.columns if changes else self.columns
+
+class BolAdapter(SiteAdapter):
+    name = 'bol'
+    description = 'bol.com search results'
+    base_url = 'https://www.bol.com'
+    search_url = 'https://www.bol.com/nl/nl/s/?searchtext={query}'
+    page_suffix = '&page={page}'
+    default_query = 'laptops'
+
+    strainer = class_strainer('product-item--row', r'pagination\S*')
+    listing = ('li', {'class': 'product-item--row'})
+    fields = {
+        'title': text('a', 'product-title'),
+        # The cents sit in a <sup>, so join them back with a decimal comma: "€895,49" or "€862,-"
+        'price': text('span', 'promo-price', separator=',', prefix='€'),
+        'url': link('a', 'product-title', base='https://www.bol.com'),
+    }
+    record = BolListing
+    next_link = ('a', {'class': 'pagination__next'})
+    page_pattern = r'[?&]page=(\d+)'
+
+    columns = [('title', 'Title'), ('price', 'Price')] + PRICE_COLUMNS + [('url', 'URL')]
+    widths = [30, 20] + PRICE_COLUMN_WIDTHS + [50]
+    currency = 'EUR'
+
+    directory = 'Bol_Data'
+    file_prefix = 'bol_com'
+
+class MarktplaatsAdapter(SiteAdapter):
+    name = 'marktplaats'
+    description = 'Marktplaats search results'
+    base_url = 'https://www.marktplaats.nl'
+    search_url = 'https://www.marktplaats.nl/q/{query}/'
+    page_suffix = 'p/{page}/'
+    default_query = 'laptops'
+
+    strainer = class_strainer('hz-Listing', r'hz-PaginationControls\S*', r'pagination\S*')
+    listing = ('li', {'class': 'hz-Listing'})
+    fields = {
+        'title': text('h3', 'hz-Listing-title'),
+        'price': text('p', 'hz-Listing-price'),
+        'seller': text('span', 'hz-Listing-seller-name'),
+        'location': text('span', 'hz-Listing-location'),
+        'url': link('a', 'hz-Listing-coverLink', base='https://www.marktplaats.nl'),
+    }
+    record = MarktplaatsListing
+    next_link = ('a', {'class': 'pagination-button-next'})
+    page_pattern = r'/p/(\d+)/?'
+
+    columns = [('title', 'Title'), ('price', 'Price')] + PRICE_COLUMNS + [('seller', 'Seller'), ('location', 'Location'), ('url', 'URL')]
+    widths = [30, 20] + PRICE_COLUMN_WIDTHS + [30, 30, 50]
+    hash_fields = ('title', 'price', 'seller')
+    currency = 'EUR'
+
+    directory = 'Marktplaats_Data'
+    file_prefix = 'marktplaats'
+
+def amazon_strainer(name, attrs=None):
+    # Search result cards and the pagination strip; an attribute and a class, which a
+    # single keyword SoupStrainer can't combine. Each card is kept whole, so on a page
+    # that is mostly cards this saves little over a full lxml tree.
+    attrs = attrs or {}
+    return attrs.get('data-component-type') == 's-search-result' or 's-pagination-strip' in (attrs.get('class') or '')
+
+class AmazonAdapter(SiteAdapter):
+    # One adapter per Amazon storefront, they only differ in domain and currency
+    search_url = '{base_url}/s?k={query}'
+    page_suffix = '&page={page}'
+    default_query = 'laptop'
+
+    strainer = SoupStrainer(amazon_strainer)
+    record = AmazonListing
+    listing = ('div', {'data-component-type': 's-search-result', 'data-asin': True})
+    next_link = ('a', {'class': 's-pagination-next'})
+    page_pattern = r'[?&]page=(\d+)'
+
+    columns = [('asin', 'ASIN'), ('title', 'Title'), ('price', 'Price')] + PRICE_COLUMNS + [('rating', 'Rating'), ('reviews', 'Reviews'), ('url', 'URL')]
+    widths = [12, 40, 20] + PRICE_COLUMN_WIDTHS + [20, 12, 50]
+    key_field = 'asin'
+    hash_fields = ('title', 'price')
+
+    directory = 'Amazon_Data'
+
+    def __init__(self, domain, currency):
+        self.name = domain
+        self.description = f'{domain} search results'
+        self.base_url = f'https://www.{domain}'
+        self.currency = currency
+        # amazon.items.py records amazon.nl prices as 'amazon', keep adding to that series
+        self.history_source = 'amazon' if domain == 'amazon.nl' else domain
+        self.file_prefix = domain.replace('.', '_')
+        self.fields = {
+            'asin': attribute('data-asin'),
+            'title': text('h2'),
+            'price': text('span', 'a-offscreen'),
+            'rating': text('span', 'a-icon-alt'),
+            'reviews': text('span', 'a-size-base s-underline-text'),
+            'shipping': text('div', 'a-row a-size-base a-color-secondary s-align-children-center', separator=' '),
+            'url': link('a', 'a-link-normal s-no-outline', base=self.base_url),
+        }
+
+    def first_url(self, query=None):
+        return self.search_url.format(base_url=self.base_url, query=quote_plus(query or self.default_query))
+
+class SteamAdapter(SiteAdapter):
+    # The market is paged through its JSON search endpoint rather than HTML pages, and
+    # pagination follows the reported total count. The query searches item names.
+    name = 'steam'
+    description = 'Steam community market, CS2 items (query searches item names)'
+    search_url = steam_market.SEARCH_RENDER_URL
+    default_query = ''
+    appid = 730
+    record = SteamItem
+
+    columns = [('name', 'Name'), ('price', 'Price')] + PRICE_COLUMNS + [('link', 'Link'), ('image', 'Image URL')]
+    widths = [30, 20] + PRICE_COLUMN_WIDTHS + [50, 50]
+    key_field = 'name'
+    title_field = 'name'
+    hash_fields = ('name', 'price')
+
+    directory = 'Steam_Market_Data'
+    file_prefix = 'steam_market'
+    file_kind = 'top_items'
+    sheet_name = 'Top Items'
+    excel_options = {'banded': True, 'highlight': ('price', 'USD')}
+
+    def first_url(self, query=None):
+        return self.page_url(query, 1)
+
+    def page_url(self, query, page):
+        params = steam_market.build_search_params(self.appid, page, query=query or self.default_query)
+        return f'{self.search_url}?{urlencode(params)}'
+
+    def page_urls(self, query=None):
+        return lambda page: self.page_url(query, page)
+
+    def parse_page(self, body):
+        # A JSON page from the search endpoint; the last page follows from the total count
+        data = json.loads(body)
+        if not data.get('success'):
+            return [], None, None
+        total = data.get('total_count') or 0
+        return [SteamItem(**item) for item in steam_market.iter_search_results(data)], math.ceil(total / steam_market.PAGE_SIZE) or None, None
+
+    def iter_pages(self, query=None, max_pages=None, concurrency=4, delay=1.0, pool=None, status=None):
+        # On its own the market is crawled through steam_crawler, which pauses every
+        # worker when Steam answers 429. Its JSON pages are cheap to parse, so the
+        # parse pool isn't used.
+        rate = 1 / delay if delay else 0
+        # crawl_pages() runs until the market is exhausted when there is no end page
+        for _, items in steam_crawler.crawl_pages(self.appid, 1, max_pages, workers=concurrency, rate=rate, base_url=self.search_url, query=query or self.default_query,
+                                                  status=status):
+            yield [SteamItem(**item) for item in items]
+
+ADAPTERS = {}
+
+def register(adapter):
+    ADAPTERS[adapter.name] = adapter
+    return adapter
+
+def get_adapter(name):
+    adapter = ADAPTERS.get(name)
+    if adapter is None:
+        raise KeyError(f"Unknown site '{name}', choose from: {', '.join(sorted(ADAPTERS))}")
+    return adapter
+
+def parse_site_page(name, body):
+    # Module-level entry point for parse_pool workers
+    return get_adapter(name).parse_page(body)
+
+register(AmazonAdapter('amazon.com', 'USD'))
+register(AmazonAdapter('amazon.nl', 'EUR'))
+register(BolAdapter())
+register(MarktplaatsAdapter())
+register(SteamAdapter())
@@ -0,0 +1,128 @@
+import threading
+import time
+
+class Snapshot:
+    # One complete set of scraped pages. Rows are kept as plain tuples in column order
+    # instead of dicts, which roughly halves their memory, and turned back into dicts
+    # when a page is read. A snapshot is never modified after it was built.
+    def __init__(self, columns, pages, taken):
+        self.columns = tuple(columns)
+        self.pages = {page: tuple(tuple(row.get(column, '') for column in self.columns) for row in rows)
+                      for page, rows in pages.items()}
+        self.taken = dict(taken)  # page -> time.time() the page was scraped
+
+    def items(self, page):
+        rows = self.pages.get(page)
+        if rows is None:
+            return None
+        return [dict(zip(self.columns, row)) for row in rows]
+
+    def age(self, page):
+        taken = self.taken.get(page)
+        return None if taken is None else time.time() - taken
+
+class SnapshotStore:
+    # Holds the latest Snapshot. Readers grab the current one with a single attribute
+    # read and the refresher replaces it in one assignment, so a request never sees a
+    # half-refreshed set of pages and readers never take a lock.
+    def __init__(self, columns):
+        self.columns = [column for column, _ in columns]
+        self._snapshot = Snapshot(self.columns, {}, {})
+
+    def current(self):
+        return self._snapshot
+
+    def swap(self, pages, taken):
+        self._snapshot = Snapshot(self.columns, pages, taken)
+        return self._snapshot
+
+    def page(self, page):
+        # (items, age in seconds) of a page, or (None, None) when it isn't in the snapshot
+        snapshot = self._snapshot
+        return snapshot.items(page), snapshot.age(page)
+
+class SnapshotRefresher:
+    # Background thread that scrapes pages 1..pages every `interval` seconds and swaps
+    # the result into a SnapshotStore. Pages whose scrape fails or comes back empty keep
+    # their previous rows, so a hiccup at Steam doesn't blank the site.
+    def __init__(self, store, fetch, pages=5, interval=300, delay=1.0):
+        self.store = store
+        self.fetch = fetch
+        self.pages = pages
+        self.interval = interval
+        self.delay = delay  # Pause between pages so a refresh doesn't hammer Steam
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Counters exposed through stats()
+        self.refreshes = 0
+        self.failures = 0
+        self.last_refresh = None
+        self.last_duration = None
+
+    def start(self):
+        # Safe to call on every request; only the first call starts the thread
+        with self._lock:
+            if self._thread is None and self.interval > 0:
+                self._thread = threading.Thread(target=self._loop, name='snapshot', daemon=True)
+                self._thread.start()
+
+    def refresh_now(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def refresh(self):
+        started = time.time()
+        previous = self.store.current()
+        pages, taken = {}, {}
+
+        for page in range(1, self.pages + 1):
+            if self._stop.is_set():
+                return
+            try:
+                rows = self.fetch(page)
+            except Exception as e:
+                print(f"Snapshot refresh of page {page} failed: {e}")
+                rows = None
+            if rows:
+                pages[page] = rows
+                taken[page] = time.time()
+            elif page in previous.pages:
+                self.failures += 1
+                pages[page] = previous.items(page)
+                taken[page] = previous.taken[page]
+            else:
+                self.failures += 1
+            if page < self.pages and self.delay:
+                self._stop.wait(self.delay)
+
+        self.store.swap(pages, taken)
+        self.refreshes += 1
+        self.last_refresh = time.time()
+        self.last_duration = self.last_refresh - started
+
+    def stats(self):
+        snapshot = self.store.current()
+        ages = [snapshot.age(page) for page in snapshot.pages]
+        return {
+            'pages': sorted(snapshot.pages),
+            'rows': sum(len(rows) for rows in snapshot.pages.values()),
+            'oldest_page_age': max(ages) if ages else None,
+            'interval': self.interval,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_refresh': self.last_refresh,
+            'last_duration': self.last_duration,
+        }
@@ -0,0 +1,119 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import http_session
+import steam_market
+from async_pages import CrawlStatus
+from rate_limit import TokenBucket, backoff_delay, retry_after_seconds
+from result_cache import steam_key
+
+def fetch_page(appid, page, sort, limiter, base_url=steam_market.SEARCH_RENDER_URL, count=steam_market.PAGE_SIZE, max_retries=5, timeout=10, query=''):
+    # Returns (items, total_count); items is None when the page could not be fetched
+    params = steam_market.build_search_params(appid, page, sort, count, query)
+
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            # Retries are handled here so a 429 can pause every worker at once
+            response = http_session.get(base_url, params=params, timeout=timeout, retries=0)
+        except requests.RequestException:
+            response = None
+
+        if response is not None and response.status_code == 200:
+            try:
+                data = response.json()
+            except ValueError:
+                data = None
+            if data and data.get('success'):
+                return steam_market.parse_search_results(data), data.get('total_count')
+        elif response is not None and response.status_code != 429 and response.status_code < 500:
+            print(f"Failed to retrieve market page {page}. Status code: {response.status_code}")
+            return None, None
+        if getattr(response, 'from_cache', False):
+            # A replay miss (or a stored page that doesn't parse) comes back the same on
+            # every attempt, so retrying would only wait out the backoff
+            print(f"Failed to retrieve market page {page} from the response cache. Status code: {response.status_code}")
+            return None, None
+
+        if attempt == max_retries:
+            break
+
+        delay = retry_after_seconds(response) or backoff_delay(attempt, base=2.0)
+        if response is not None and response.status_code == 429:
+            # Being rate limited affects every worker, so hold them all back
+            limiter.pause(delay)
+        time.sleep(delay)
+
+    print(f"Giving up on market page {page} after {max_retries + 1} attempts.")
+    return None, None
+
+def crawl_pages(appid=730, start_page=1, end_page=None, workers=4, rate=1.0, sort='popular_desc', base_url=steam_market.SEARCH_RENDER_URL, count=steam_market.PAGE_SIZE, max_retries=5, query='',
+                status=None, cache=None):
+    # Yields (page, items) in page order while later pages are fetched in the
+    # background. With end_page=None the crawl runs until the market is exhausted.
+    # An async_pages.CrawlStatus passed as status counts the pages that were given up on.
+    # Pages found in a result_cache.ResultCache passed as cache are not requested again.
+    status = status or CrawlStatus()
+    exhaustive = end_page is None
+    limiter = TokenBucket(rate, burst=workers)
+
+    def fetch(page):
+        if cache is None:
+            return fetch_page(appid, page, sort, limiter, base_url, count, max_retries, query=query)
+        key = steam_key(appid, page, sort, query)
+        result = cache.get(key)
+        if result is None:
+            result = fetch_page(appid, page, sort, limiter, base_url, count, max_retries, query=query)
+            # Pages that failed are not stored; an empty page only briefly
+            if result[0] is not None:
+                cache.put(key, result, cache.ttl if result[0] else cache.empty_ttl)
+        return result
+
+    next_page = start_page
+    if end_page is None:
+        # The first page tells us how many pages there are in total
+        items, total_count = fetch(start_page)
+        if not items:
+            if items is None:
+                status.failed += 1
+            else:
+                status.complete = True
+            return
+        yield start_page, items
+        next_page += 1
+        end_page = math.ceil(total_count / count) if total_count else start_page
+
+    pages = iter(range(next_page, end_page + 1))
+    window = workers * 2  # Pages fetched ahead of the one we are waiting for
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        def fill():
+            while len(pending) < window:
+                page = next(pages, None)
+                if page is None:
+                    return
+                pending[page] = pool.submit(fetch, page)
+
+        fill()
+        while next_page in pending:
+            items, _ = pending.pop(next_page).result()
+            if items is not None and not items:
+                # An empty page means we ran past the last one
+                for future in pending.values():
+                    future.cancel()
+                status.complete = True
+                break
+            if items:
+                yield next_page, items
+            else:
+                status.failed += 1
+            next_page += 1
+            fill()
+        else:
+            # Ran to the last page of the total count, not just to the requested end page
+            status.complete = exhaustive
@@ -0,0 +1,87 @@
+from urllib.parse import quote
+
+import requests
+
+import http_session
+from parsing import id_strainer, parse_html
+
+SEARCH_RENDER_URL = 'https://steamcommunity.com/market/search/render/'
+LISTING_URL = 'https://steamcommunity.com/market/listings/{appid}/{hash_name}'
+IMAGE_URL = 'https://community.cloudflare.steamstatic.com/economy/image/{icon_url}/62fx62f'
+PAGE_SIZE = 10  # Rows per page on the market search page
+SEARCH_CURRENCY = 'USD'  # The search endpoint always prices in US dollars
+SEARCH_ROWS_STRAINER = id_strainer('searchResultsRows')
+
+def build_search_params(appid, page, sort='popular_desc', count=PAGE_SIZE, query=''):
+    sort_column, sort_dir = sort.rsplit('_', 1)
+    return {
+        'query': query,
+        'start': (page - 1) * count,
+        'count': count,
+        'search_descriptions': 0,
+        'sort_column': sort_column,
+        'sort_dir': sort_dir,
+        'appid': appid,
+        'norender': 1,
+    }
+
+def fetch_search_page(appid, page, sort='popular_desc', count=PAGE_SIZE, timeout=10, base_url=SEARCH_RENDER_URL):
+    # Returns the decoded JSON response, or None when Steam refused or returned garbage
+    try:
+        response = http_session.get(base_url, params=build_search_params(appid, page, sort, count), timeout=timeout)
+    except requests.RequestException as e:
+        print(f"Failed to reach the Steam market: {e}")
+        return None
+
+    if response.status_code != 200:
+        print(f"Failed to retrieve market page {page}. Status code: {response.status_code}")
+        return None
+
+    try:
+        data = response.json()
+    except ValueError:
+        return None
+
+    if not data or not data.get('success'):
+        return None
+    return data
+
+def price_text(result):
+    # "$13.15 USD", like the price text of the HTML rows, so exports show the same
+    # prices whichever way the page was fetched
+    text = result.get('sell_price_text', '')
+    return f'{text} {SEARCH_CURRENCY}' if text and not text.endswith(SEARCH_CURRENCY) else text
+
+def iter_search_results(data):
+    for result in data.get('results') or []:
+        description = result.get('asset_description') or {}
+        appid = description.get('appid', data.get('appid', ''))
+        hash_name = result.get('hash_name') or result.get('name', '')
+        icon_url = description.get('icon_url')
+
+        yield {
+            'name': result.get('name', ''),
+            'price': price_text(result),
+            'link': LISTING_URL.format(appid=appid, hash_name=quote(hash_name)),
+            'image': IMAGE_URL.format(icon_url=icon_url) if icon_url else ''
+        }
+
+def parse_search_results(data):
+    return list(iter_search_results(data))
+
+def iter_search_rows(html):
+    # Rows of the HTML search results page, as rendered by the browser or the plain request
+    results = parse_html(html, SEARCH_ROWS_STRAINER).find('div', id='searchResultsRows')
+    if results is None:
+        return
+    for item in results.find_all('a', class_='market_listing_row_link'):
+        name = item.find('span', class_='market_listing_item_name').text
+        price = item.find('span', class_='normal_price').text.strip()
+        link = item['href']
+        image = item.find('img')['src']
+        yield {
+            'name': name,
+            'price': price,
+            'link': link,
+            'image': image
+        }